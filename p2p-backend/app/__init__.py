@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_cors import CORS
 from .routes.api_routes import api_bp
+from .routes.admin_routes import admin_bp
+from .routes.metrics_routes import metrics_bp
 
 
 def create_app():
@@ -9,5 +11,7 @@ def create_app():
 
     with app.app_context():
         app.register_blueprint(api_bp, url_prefix="/api")
+        app.register_blueprint(admin_bp, url_prefix="/api/admin")
+        app.register_blueprint(metrics_bp)
 
     return app
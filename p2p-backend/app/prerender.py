@@ -0,0 +1,157 @@
+from __future__ import annotations
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only the gzip variants are written
+    brotli = None
+
+from app import create_app
+from app.routes.http_caching import APP_REVISION
+from app.services.data.data_loader import AGE_LABELS, list_datasets, load_dataset
+from app.services.visualization.payload import OUTPUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT = 1
+
+# Charts determined by the dataset alone (plus exact/format)
+GENERAL_ROUTES = [
+    "participation-by-year",
+    "average-time-by-year",
+    "participation-by-age-group",
+    "participation-by-region",
+    "time-percentiles-by-year",
+    "gender-distribution-by-year",
+    "median-time-by-year",
+    "top-10-fastest-swimmers",
+    "average-time-by-age-group-and-year",
+]
+AGE_VS_TIME_ROUTE = "age-vs-time-distribution"
+GROUP_ROUTE = "user-average-time-gender-age-group-and-year"
+
+
+def age_group_slug(age_group: str) -> str:
+    return age_group.replace("+", "plus")
+
+
+def enumerate_requests(dataset_id: str, genders: List[str]) -> Iterator[Tuple[str, Dict[str, str], str]]:
+    """
+    Every response of a dataset that does not depend on a swimmer.
+
+    Yields:
+        (route, query, file) per response; manifest.json maps each url to its file
+    """
+    for output_format in OUTPUT_FORMATS:
+        base = {"dataset": dataset_id, "format": output_format}
+        directory = f"{dataset_id}/{output_format}"
+        for route in GENERAL_ROUTES:
+            yield route, base, f"{directory}/{route}.json"
+            yield route, {**base, "exact": "true"}, f"{directory}/{route}.exact.json"
+        yield AGE_VS_TIME_ROUTE, base, f"{directory}/{AGE_VS_TIME_ROUTE}.json"
+        yield AGE_VS_TIME_ROUTE, {**base, "mode": "sample"}, f"{directory}/{AGE_VS_TIME_ROUTE}.sample.json"
+        for gender in genders:
+            for age_group in AGE_LABELS:
+                query = {**base, "gender": gender, "age_group": age_group}
+                stem = f"{directory}/{GROUP_ROUTE}/{gender}/{age_group_slug(age_group)}"
+                yield GROUP_ROUTE, query, f"{stem}.json"
+                yield GROUP_ROUTE, {**query, "overlay": "true"}, f"{stem}.overlay.json"
+
+
+def write_variants(path: Path, body: bytes) -> Dict[str, int]:
+    """Write body plus its gzip (and brotli) encodings, for servers that send precompressed files."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    sizes = {"bytes": len(body)}
+    # mtime=0 keeps rebuilds of unchanged data byte-identical
+    compressed = gzip.compress(body, compresslevel=9, mtime=0)
+    path.with_name(path.name + ".gz").write_bytes(compressed)
+    sizes["gzip_bytes"] = len(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=11)
+        path.with_name(path.name + ".br").write_bytes(compressed)
+        sizes["br_bytes"] = len(compressed)
+    return sizes
+
+
+def prerender(output: Path, dataset_ids: Optional[List[str]] = None) -> dict:
+    """
+    Render every non-personalized response through the app's own routes into output.
+
+    The files are written to a staging directory that replaces output once complete,
+    so a server reading output never sees a half-built tree. The files are a snapshot of the
+    dataset versions in the manifest; rebuild them after an ingest or reload.
+
+    Args:
+        output: Directory to write the files and manifest.json into
+        dataset_ids: Datasets to render; all datasets in the data directory by default
+
+    Returns:
+        The manifest
+    """
+    client = create_app().test_client()
+    dataset_ids = dataset_ids or [dataset["id"] for dataset in list_datasets()["datasets"]]
+    staging = output.with_name(f"{output.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "revision": APP_REVISION,
+        "datasets": {},
+        "files": [],
+        "skipped": [],
+    }
+    for dataset_id in dataset_ids:
+        dataset = load_dataset(dataset_id)
+        genders = sorted(str(gender) for gender in dataset.df["Gender"].dropna().unique())
+        manifest["datasets"][dataset_id] = {
+            "version": dataset.version,
+            "rows": len(dataset.df),
+            "last_modified": dataset.last_modified.isoformat(),
+        }
+        for route, query, file in enumerate_requests(dataset_id, genders):
+            url = f"/api/{route}?{urlencode(query)}"
+            response = client.get(f"/api/{route}", query_string=query)
+            if response.status_code != 200:
+                # e.g. no swimmers of that gender in that age group
+                manifest["skipped"].append({"url": url, "status": response.status_code})
+                continue
+            body = response.get_data()
+            sizes = write_variants(staging / file, body)
+            manifest["files"].append({"url": url, "file": file, "sha256": hashlib.sha256(body).hexdigest(), **sizes})
+        logger.info(f"Pre-rendered dataset '{dataset_id}'")
+
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Pre-render the chart responses that do not depend on a swimmer as static files"
+    )
+    parser.add_argument("--output", default="./prerendered", help="Directory to write the files into (replaced as a whole)")
+    parser.add_argument("--datasets", help="Comma-separated dataset ids (default: every dataset in DATA_DIR)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manifest = prerender(Path(args.output), args.datasets.split(",") if args.datasets else None)
+    total = sum(entry["bytes"] for entry in manifest["files"])
+    logger.info(f"Wrote {len(manifest['files'])} responses ({total} bytes), skipped {len(manifest['skipped'])}, to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
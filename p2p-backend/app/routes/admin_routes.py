@@ -0,0 +1,105 @@
+import hmac
+import os
+from datetime import datetime
+from functools import wraps
+import requests
+from flask import Blueprint, Response, request, jsonify
+from app.services.data.data_gatherer import ResultsFetcher
+from app.services.data.data_loader import DATASET_ID, AlreadyIngested, DEFAULT_DATASET, ingest_results, reload_in_background, reload_status
+from app.services.monitoring.profiler import collapse
+from .profiling import PROFILES
+
+admin_bp = Blueprint("admin", __name__)
+
+
+def require_admin_token(view):
+    """Admin routes are disabled unless ADMIN_TOKEN is set, and then need it in X-Admin-Token."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get("ADMIN_TOKEN")
+        if not token or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+            return {"error": "Forbidden"}, 403
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@admin_bp.route("/ingest", methods=["POST"])
+@require_admin_token
+def ingest_race():
+    # Only the worker serving this request has the new rows right away. The other workers reload
+    # the dataset once their watcher sees the CSV change (DATA_WATCH_INTERVAL, on by default under
+    # gunicorn when ADMIN_TOKEN is set); until then they keep serving the previous rows
+    body = request.get_json(silent=True) or {}
+    event_id = body.get("event_id")
+    event_course_id = body.get("event_course_id")
+    race_date = body.get("race_date")
+    dataset_id = str(body.get("dataset", DEFAULT_DATASET))
+    if not event_id or not event_course_id or not race_date:
+        return {"error": "event_id, event_course_id and race_date are required"}, 400
+    if not DATASET_ID.fullmatch(dataset_id):
+        return {"error": "dataset may only contain letters, digits, '-' and '_'"}, 400
+
+    try:
+        race_date = datetime.strptime(race_date, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "race_date must be formatted as YYYY-MM-DD"}, 400
+
+    try:
+        results = ResultsFetcher().fetch_and_parse(str(event_id), str(event_course_id), race_date)
+    except requests.RequestException as e:
+        return {"error": f"Fetching results failed: {e}"}, 502
+    if results.empty:
+        return {"error": "No results found for this event course"}, 404
+
+    try:
+        dataset = ingest_results(results, dataset_id)
+    except AlreadyIngested as e:
+        return {"error": str(e)}, 409
+    except ValueError as e:
+        return {"error": f"The results could not be ingested: {e}"}, 400
+
+    return jsonify({"ingested": len(results), "total_rows": len(dataset.df), "version": dataset.version})
+
+
+@admin_bp.route("/reload", methods=["POST"])
+@require_admin_token
+def reload_datasets():
+    # Reloads the datasets of the worker serving this request; DATA_WATCH_INTERVAL covers every worker
+    datasets = (request.get_json(silent=True) or {}).get("datasets")
+    if datasets is not None and (not isinstance(datasets, list) or not all(isinstance(d, str) for d in datasets)):
+        return {"error": "datasets must be a list of dataset ids"}, 400
+
+    if not reload_in_background(datasets):
+        return {"error": "A reload is already running", "reload": reload_status()}, 409
+    return jsonify(reload_status()), 202
+
+
+@admin_bp.route("/reload", methods=["GET"])
+@require_admin_token
+def get_reload_status():
+    return jsonify(reload_status())
+
+
+# Profiles are kept per worker process; each listing shows the worker that served it
+@admin_bp.route("/profiles", methods=["GET"])
+@require_admin_token
+def list_profiles():
+    return jsonify(PROFILES.list())
+
+
+@admin_bp.route("/profiles/collapsed", methods=["GET"])
+@require_admin_token
+def get_merged_profile():
+    # Every buffered profile (or one route's, e.g. ?route=/api/user-percentile-by-year) as one flame graph
+    return Response(collapse(PROFILES.merged(request.args.get("route"))), mimetype="text/plain")
+
+
+@admin_bp.route("/profiles/<profile_id>", methods=["GET"])
+@require_admin_token
+def get_profile(profile_id):
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        return {"error": f"No profile '{profile_id}' in this worker"}, 404
+    return Response(collapse(profile.stacks), mimetype="text/plain")
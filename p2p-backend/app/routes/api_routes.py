@@ -1,34 +1,209 @@
-from flask import Blueprint, request, jsonify
-from app.services.data.data_loader import load_data
+import os
+from functools import wraps
+from flask import Blueprint, Response, g, request, jsonify, make_response
+from app.services.cache.query_cache import create_query_cache
+from app.services.cache.response_cache import ResponseCache
+from app.services.data.data_loader import DEFAULT_DATASET, UnknownDataset, list_datasets, load_dataset
 from app.services.analysis.general_analysis import GeneralAnalysis
 from app.services.analysis.user_analysis import UserAnalysis
 from app.services.visualization.general_visualizer import GeneralVisualizer
+from app.services.visualization.layout import Layout
+from app.services.visualization.payload import UnsupportedFormat, json_response, requested_format
 from app.services.visualization.user_visualizer import UserVisualizer
+from app.services.monitoring.stages import record_cache_lookup, timed
+from .http_caching import APP_REVISION, init_conditional_responses, skip_conditional
+from .instrumentation import init_instrumentation
+from .offload import create_offloader
+from .profiling import init_profiling
 
 api_bp = Blueprint("api", __name__)
+response_cache = ResponseCache()
+query_cache = create_query_cache()
+
+MAX_BATCH_NAMES = 200
+MAX_SCATTER_POINTS = int(os.environ.get("MAX_SCATTER_POINTS", "2000"))
+MAX_BINS = 200
+ROWS_PAGE_SIZE = 1000
+MAX_ROWS_PAGE_SIZE = 10000
+RIVALS = 5
+MAX_RIVALS = 50
+
+
+class InvalidArgument(ValueError):
+    pass
+
+
+def int_arg(name, default, minimum, maximum):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise InvalidArgument(f"{name} must be an integer")
+    if not minimum <= value <= maximum:
+        raise InvalidArgument(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def requested_dataset_id():
+    dataset = request.args.get("dataset")
+    if dataset is None and request.is_json:
+        dataset = (request.get_json(silent=True) or {}).get("dataset")
+    return str(dataset or DEFAULT_DATASET)
+
+
+@timed("dataset")
+def dataset_from_request():
+    # Pin one dataset per request so the frame, its indexes and its version always match,
+    # even if ingestion or a reload swaps in a new one mid-request
+    if "dataset" not in g:
+        g.dataset = load_dataset(requested_dataset_id())
+    return g.dataset
 
 
 def load_dataset_from_request():
-    dataset_type = request.args.get("dataset", "competitive")
-    return load_data(competitive=(dataset_type == "competitive"))
+    return dataset_from_request().data()
+
+
+def load_name_index_from_request():
+    return dataset_from_request().name_index
+
+
+def load_search_index_from_request():
+    return dataset_from_request().search_index
+
+
+def load_percentile_engine_from_request():
+    return dataset_from_request().percentile_engine
+
+
+def load_aggregates_from_request():
+    # exact=true recomputes from the full frame instead of answering from the running aggregates
+    if request.args.get("exact", "false").lower() == "true":
+        return None
+    return dataset_from_request().aggregates
+
+
+def dataset_validators():
+    # Tagged by the CSV's state rather than the version, which each worker counts on its own
+    dataset = dataset_from_request()
+    size, mtime_ns = dataset.source
+    return f"{dataset.dataset_id}:{size}:{mtime_ns}", dataset.last_modified
+
+
+def pinned_dataset_id():
+    return g.dataset.dataset_id if "dataset" in g else ""
+
+
+init_profiling(api_bp, pinned_dataset_id)
+init_instrumentation(api_bp, pinned_dataset_id)
+init_conditional_responses(api_bp, dataset_validators)
+offloaded = create_offloader(dataset_from_request)
+
+
+@api_bp.errorhandler(UnknownDataset)
+def unknown_dataset(e):
+    return {"error": str(e.args[0])}, 404
+
+
+@api_bp.errorhandler(UnsupportedFormat)
+def unsupported_format(e):
+    return {"error": str(e)}, 400
+
+
+def cached_by_dataset(view):
+    """Serve the stored response body while the dataset's data version is unchanged."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (
+            request.endpoint,
+            requested_dataset_id(),
+            request.args.get("exact", "false").lower() == "true",
+            requested_format(),
+        )
+        version = dataset_from_request().version
+        body = response_cache.get(key, version)
+        record_cache_lookup("response", body is not None)
+        if body is not None:
+            return Response(body, mimetype="application/json")
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response_cache.set(key, version, response.get_data())
+        return response
+
+    return wrapper
+
+
+def flag(value):
+    return value.lower() == "true"
+
+
+def as_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def dataset_key():
+    # The CSV's state rather than the version, which each worker counts on its own; with a
+    # shared backend, workers holding different rows must not share entries
+    dataset = dataset_from_request()
+    return dataset.dataset_id, dataset.source
+
+
+def cached_query(**normalizers):
+    """
+    Cache the response of a parameterized route in the query cache.
+
+    Keyed on the dataset's CSV state and each listed parameter passed through its normalizer,
+    which must mirror how the view reads it so equivalent queries share an entry.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            params = tuple(
+                (param, normalize(request.args[param]) if param in request.args else None) for param, normalize in normalizers.items()
+            )
+            key = dataset_key() + (requested_format(), params)
+            body = query_cache.get_response(request.endpoint, key)
+            record_cache_lookup("query", body is not None)
+            if body is not None:
+                return Response(body, mimetype="application/json")
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                query_cache.set_response(request.endpoint, key, response.get_data())
+            return response
+
+        return wrapper
+
+    return decorator
 
 
 # General Plot Routes
 @api_bp.route("/participation-by-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_participation_over_years():
     df = load_dataset_from_request()
-    participation_data = GeneralAnalysis.get_participation_by_year(df)
+    participation_data = GeneralAnalysis.get_participation_by_year(df, load_aggregates_from_request())
     return GeneralVisualizer.plot_participation_by_year(participation_data)
 
 
 @api_bp.route("/average-time-by-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_average_time_over_years():
     df = load_dataset_from_request()
-    avg_time, overall_avg_time = GeneralAnalysis.get_average_time_by_year(df)
+    avg_time, overall_avg_time = GeneralAnalysis.get_average_time_by_year(df, load_aggregates_from_request())
     return GeneralVisualizer.plot_average_time_by_year(avg_time, overall_avg_time)
 
 
 @api_bp.route("/participation-by-age-group", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_participation_by_age_group():
     df = load_dataset_from_request()
     age_group_counts = GeneralAnalysis.get_participation_by_age_group(df)
@@ -36,6 +211,8 @@ def get_participation_by_age_group():
 
 
 @api_bp.route("/participation-by-region", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_regional_participation():
     df = load_dataset_from_request()
     top_regions = GeneralAnalysis.get_participation_by_region(df)
@@ -43,27 +220,68 @@ def get_regional_participation():
 
 
 @api_bp.route("/time-percentiles-by-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_time_percentiles():
     df = load_dataset_from_request()
-    percentiles = GeneralAnalysis.get_time_percentiles(df)
+    percentiles = GeneralAnalysis.get_time_percentiles(df, load_aggregates_from_request())
     return GeneralVisualizer.plot_time_percentiles(percentiles)
 
 
 @api_bp.route("/gender-distribution-by-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_gender_distribution():
     df = load_dataset_from_request()
     gender_distribution = GeneralAnalysis.get_gender_distribution_by_year(df)
     return GeneralVisualizer.plot_gender_distribution_by_year(gender_distribution)
 
 
+@api_bp.route("/age-vs-time-distribution", methods=["GET"])
+@offloaded
+def get_age_vs_time_distribution():
+    # Never one point per row: either a 2D histogram or a sample capped at max_points
+    df = load_dataset_from_request()
+    mode = request.args.get("mode", "bins")
+    try:
+        if mode == "bins":
+            counts, age_edges, time_edges = GeneralAnalysis.get_age_vs_time_bins(
+                df, int_arg("age_bins", 20, 1, MAX_BINS), int_arg("time_bins", 40, 1, MAX_BINS)
+            )
+            return GeneralVisualizer.plot_age_vs_time_bins(counts, age_edges, time_edges)
+        if mode == "sample":
+            sample = GeneralAnalysis.get_age_vs_time_sample(df, int_arg("max_points", MAX_SCATTER_POINTS, 1, MAX_SCATTER_POINTS))
+            return GeneralVisualizer.plot_age_vs_time_distribution(sample)
+    except InvalidArgument as e:
+        return {"error": str(e)}, 400
+    return {"error": "mode must be 'bins' or 'sample'"}, 400
+
+
+@api_bp.route("/age-vs-time-distribution/rows", methods=["GET"])
+@offloaded
+def get_age_vs_time_rows():
+    df = load_dataset_from_request()
+    try:
+        offset = int_arg("offset", 0, 0, len(df))
+        limit = int_arg("limit", ROWS_PAGE_SIZE, 1, MAX_ROWS_PAGE_SIZE)
+    except InvalidArgument as e:
+        return {"error": str(e)}, 400
+    rows, total = GeneralAnalysis.get_rows_page(df, ["Age", "Time (min)"], offset, limit)
+    return GeneralVisualizer.rows_page(rows, offset, total)
+
+
 @api_bp.route("/median-time-by-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_median_over_years():
     df = load_dataset_from_request()
-    median_time, overall_median_time = GeneralAnalysis.get_median_time_by_year(df)
+    median_time, overall_median_time = GeneralAnalysis.get_median_time_by_year(df, load_aggregates_from_request())
     return GeneralVisualizer.plot_median_time_by_year(median_time, overall_median_time)
 
 
 @api_bp.route("/top-10-fastest-swimmers", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_top_10_fastest_swimmers():
     df = load_dataset_from_request()
     top_10_fastest = GeneralAnalysis.get_top_10_fastest_swimmers(df)
@@ -71,21 +289,24 @@ def get_top_10_fastest_swimmers():
 
 
 @api_bp.route("/average-time-by-age-group-and-year", methods=["GET"])
+@cached_by_dataset
+@offloaded
 def get_average_time_by_age_group_over_years():
     df = load_dataset_from_request()
-    avg_time_age_group = GeneralAnalysis.get_average_time_by_age_group_and_year(df)
+    avg_time_age_group = GeneralAnalysis.get_average_time_by_age_group_and_year(df, load_aggregates_from_request())
     return GeneralVisualizer.plot_average_time_by_age_group_and_year(avg_time_age_group)
 
 
 # User Specific Routes (Plots)
 @api_bp.route("/user-time-by-year", methods=["GET"])
+@offloaded
 def get_user_time_over_years():
     df = load_dataset_from_request()
     name = request.args.get("name", "").lower()
     if not name:
         return {"error": "Name parameter is required"}, 400
 
-    person_data, error = UserAnalysis.get_user_time_by_year(df, name)
+    person_data, error = UserAnalysis.get_user_time_by_year(df, name, load_name_index_from_request())
     if error:
         return jsonify(error), 404
 
@@ -93,13 +314,16 @@ def get_user_time_over_years():
 
 
 @api_bp.route("/user-percentile-by-year", methods=["GET"])
+@offloaded
 def get_user_percentile_over_years():
     df = load_dataset_from_request()
     name = request.args.get("name", "").lower()
     if not name:
         return {"error": "Name parameter is required"}, 400
 
-    data, error = UserAnalysis.get_user_time_percentile_by_year(df, name)
+    data, error = UserAnalysis.get_user_time_percentile_by_year(
+        df, name, load_name_index_from_request(), load_percentile_engine_from_request()
+    )
     if error:
         return jsonify(error), 404
 
@@ -107,6 +331,8 @@ def get_user_percentile_over_years():
 
 
 @api_bp.route("/user-average-time-gender-age-group-and-year", methods=["GET"])
+@cached_query(gender=str, age_group=str, name=str.lower, overlay=flag, overlay_user_time=flag)
+@offloaded
 def get_average_time_by_gender_age_group_and_year():
     df = load_dataset_from_request()
     gender = request.args.get("gender")
@@ -118,7 +344,11 @@ def get_average_time_by_gender_age_group_and_year():
     if not gender or not age_group:
         return {"error": "Gender and Age Group parameters are required"}, 400
 
-    data, error = UserAnalysis.get_average_time_by_gender_age_group_and_year(df, gender, age_group, name)
+    data, error = query_cache.memoize(
+        request.endpoint,
+        dataset_key() + (gender, age_group, name),
+        lambda: UserAnalysis.get_average_time_by_gender_age_group_and_year(df, gender, age_group, name, load_name_index_from_request()),
+    )
     if error:
         return jsonify(error), 404
 
@@ -127,15 +357,124 @@ def get_average_time_by_gender_age_group_and_year():
 
 # User Specific Routes (Stats)
 @api_bp.route("/user-position-in-year", methods=["GET"])
+@cached_query(name=str.lower, year=as_int)
+@offloaded
 def get_user_position():
     df = load_dataset_from_request()
     name = request.args.get("name", "").lower()
     year = request.args.get("year")
     if not name or not year:
         return {"error": "Name and year parameters are required"}, 400
-
-    position_data, error = UserAnalysis.find_user_position_in_year(df, name, int(year))
+    try:
+        year = int(year)
+    except ValueError:
+        return {"error": "year must be an integer"}, 400
+
+    position_data, error = query_cache.memoize(
+        request.endpoint,
+        dataset_key() + (name, year),
+        lambda: UserAnalysis.find_user_position_in_year(
+            df, name, year, load_name_index_from_request(), load_percentile_engine_from_request()
+        ),
+    )
     if error:
         return jsonify({"error": True, "message": error}), 404
 
     return jsonify(position_data)
+
+
+@api_bp.route("/user-rivals", methods=["GET"])
+@cached_query(name=str.lower, year=as_int, k=as_int)
+@offloaded
+def get_user_rivals():
+    # The k finishers just ahead of and behind the swimmer's best time, overall and in their gender and age group
+    df = load_dataset_from_request()
+    name = request.args.get("name", "").lower()
+    year = request.args.get("year")
+    if not name or not year:
+        return {"error": "Name and year parameters are required"}, 400
+    try:
+        year = int(year)
+        k = int_arg("k", RIVALS, 1, MAX_RIVALS)
+    except InvalidArgument as e:
+        return {"error": str(e)}, 400
+    except ValueError:
+        return {"error": "year must be an integer"}, 400
+
+    rivals, error = query_cache.memoize(
+        request.endpoint,
+        dataset_key() + (name, year, k),
+        lambda: UserAnalysis.find_user_rivals(df, name, year, k, load_name_index_from_request(), load_percentile_engine_from_request()),
+    )
+    if error:
+        return jsonify({"error": True, "message": error}), 404
+
+    return jsonify(rivals)
+
+
+@api_bp.route("/users/batch", methods=["POST"])
+@offloaded
+def get_batch_summary():
+    body = request.get_json(silent=True) or {}
+    names = body.get("names")
+    year = body.get("year")
+    output_format = body.get("format", "graph")
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        return {"error": "names must be a non-empty list of swimmer names"}, 400
+    if len(names) > MAX_BATCH_NAMES:
+        return {"error": f"At most {MAX_BATCH_NAMES} names can be requested at once"}, 400
+    # bool is a subclass of int, but JSON true/false is not a year
+    if year is not None and (not isinstance(year, int) or isinstance(year, bool)):
+        return {"error": "year must be an integer"}, 400
+    if output_format not in ("graph", "data"):
+        return {"error": "format must be 'graph' or 'data'"}, 400
+
+    names = list(dict.fromkeys(name.strip().lower() for name in names))
+    data, error = UserAnalysis.get_batch_summary(
+        load_dataset_from_request(), names, year, load_name_index_from_request(), load_percentile_engine_from_request()
+    )
+    if error:
+        return jsonify(error), 404
+
+    return UserVisualizer.plot_batch_summary(data, output_format)
+
+
+@api_bp.route("/swimmers/search", methods=["GET"])
+def search_swimmers():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return {"error": "q parameter is required"}, 400
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+
+    results = UserAnalysis.search_swimmers(
+        load_dataset_from_request(), query, load_search_index_from_request(), load_name_index_from_request(), limit
+    )
+    return jsonify({"query": query, "results": results})
+
+
+# Service Routes
+@api_bp.route("/layout", methods=["GET"])
+@skip_conditional
+def get_layout():
+    # Shared chart styling for format=data responses; it only changes with a deploy
+    response = json_response(Layout.style_document())
+    response.set_etag(APP_REVISION)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request)
+
+
+@api_bp.route("/datasets", methods=["GET"])
+@skip_conditional
+def get_datasets():
+    # Every dataset ?dataset=<id> can select; loading one happens on its first request
+    return jsonify(list_datasets())
+
+
+@api_bp.route("/cache-stats", methods=["GET"])
+@skip_conditional
+def get_cache_stats():
+    return jsonify({**response_cache.stats(), "query_cache": query_cache.stats()})
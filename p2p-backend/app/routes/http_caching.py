@@ -0,0 +1,122 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+from flask import Blueprint, Response, current_app, g, request
+from app.services.monitoring.stages import timed
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ENCODINGS = ["br", "gzip"]
+
+Validators = Callable[[], Tuple[str, datetime]]
+
+
+def source_revision() -> str:
+    """Digest of the app's source files: the same in every worker and after restarts, new with new code."""
+    digest = hashlib.sha1()
+    package = Path(__file__).resolve().parent.parent
+    for path in sorted(package.rglob("*.py")):
+        digest.update(path.relative_to(package).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Cloud Run sets K_REVISION per deploy, so a new build never answers 304 for an old body
+APP_REVISION = os.environ.get("K_REVISION") or source_revision()
+
+
+def skip_conditional(view):
+    """Mark a view whose response does not depend on the dataset, e.g. service stats."""
+    view.conditional = False
+    return view
+
+
+def compute_etag(data_tag: str) -> str:
+    params = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    fingerprint = f"{APP_REVISION}|{data_tag}|{request.path}?{params}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def negotiate_encoding() -> Optional[str]:
+    offered = [encoding for encoding in ENCODINGS if encoding != "br" or brotli is not None]
+    return request.accept_encodings.best_match(offered)
+
+
+@timed("compress")
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def init_conditional_responses(blueprint: Blueprint, validators: Validators) -> None:
+    """
+    Add ETag / Last-Modified validation and content-encoding negotiation to a blueprint.
+
+    The ETag is derived from the data tag and request parameters alone, so a matching
+    If-None-Match is answered with 304 before the view (and any pandas or Plotly work) runs.
+
+    Args:
+        blueprint: Blueprint whose GET views should be conditional
+        validators: Returns (data tag, last modified) for the current request; the tag must be
+            the same in every worker serving the same data
+    """
+
+    @blueprint.before_request
+    def answer_not_modified():
+        view = current_app.view_functions.get(request.endpoint)
+        if request.method != "GET" or not getattr(view, "conditional", True):
+            return None
+
+        data_tag, last_modified = validators()
+        g.etag = compute_etag(data_tag)
+        g.last_modified = last_modified
+
+        if request.if_none_match:
+            # Each encoding is its own representation with a suffixed tag; any of them is still fresh
+            variants = [g.etag] + [f"{g.etag}-{encoding}" for encoding in ENCODINGS]
+            matched = [tag for tag in variants if request.if_none_match.contains_weak(tag)]
+            if matched:
+                g.etag = matched[0]
+                return Response(status=304)
+        elif request.if_modified_since is not None and request.if_modified_since >= last_modified:
+            return Response(status=304)
+        return None
+
+    @blueprint.after_request
+    def finalize_response(response: Response) -> Response:
+        validated = "etag" in g and response.status_code in (200, 304)
+        if validated:
+            response.set_etag(g.etag)
+            response.last_modified = g.last_modified
+            response.cache_control.no_cache = True
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = negotiate_encoding()
+        body = response.get_data()
+        if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+            return response
+
+        response.set_data(compress_body(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        if validated:
+            response.set_etag(f"{g.etag}-{encoding}")
+        return response
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import os
+import time
+from typing import Callable
+from flask import Blueprint, Response, g, request
+from app.services.data.data_loader import dataset_stats
+from app.services.monitoring.metrics import REGISTRY, SIZE_BUCKETS
+from app.services.monitoring.stages import start_request_timing, stage_times
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "p2p_request_duration_seconds", "Time to answer a request, compression included", ("route", "method", "status", "dataset")
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "p2p_request_stage_duration_seconds", "Time spent in each stage of a request (dataset, analysis, render, ...)", ("route", "stage")
+)
+RESPONSE_SIZE = REGISTRY.histogram("p2p_response_size_bytes", "Response body size as sent", ("route",), SIZE_BUCKETS)
+CACHE_LOOKUPS = REGISTRY.counter("p2p_cache_lookups_total", "Response and query cache lookups", ("route", "cache", "result"))
+DATASET_ROWS = REGISTRY.gauge("p2p_dataset_rows", "Rows in the loaded dataset", ("dataset",))
+DATASET_MEMORY = REGISTRY.gauge("p2p_dataset_memory_bytes", "Memory held by the dataset's columns", ("dataset",))
+DATASET_LOAD = REGISTRY.gauge("p2p_dataset_load_seconds", "Time the last full load of the dataset took", ("dataset",))
+DATASET_VERSION = REGISTRY.gauge("p2p_dataset_version", "Data version of the dataset", ("dataset",))
+PROCESS_MEMORY = REGISTRY.gauge("p2p_process_resident_memory_bytes", "Resident memory of this worker process")
+
+
+def collect_dataset_metrics() -> None:
+    # Only the datasets loaded right now; evicted ones drop out of the gauges
+    for gauge in (DATASET_ROWS, DATASET_MEMORY, DATASET_LOAD, DATASET_VERSION):
+        gauge.clear()
+    for dataset, stats in dataset_stats().items():
+        DATASET_ROWS.set(stats["rows"], dataset=dataset)
+        DATASET_MEMORY.set(stats["memory_bytes"], dataset=dataset)
+        DATASET_LOAD.set(stats["load_seconds"], dataset=dataset)
+        DATASET_VERSION.set(stats["version"], dataset=dataset)
+    try:
+        with open("/proc/self/statm") as fh:
+            PROCESS_MEMORY.set(int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError):
+        pass
+
+
+REGISTRY.add_collector(collect_dataset_metrics)
+
+
+def init_instrumentation(blueprint: Blueprint, dataset_label: Callable[[], str]) -> None:
+    """
+    Record latency (overall and per stage), response size and cache lookups for a blueprint's routes.
+
+    Register it before any other after_request hook of the blueprint: Flask runs those hooks in
+    reverse order, so the measurement then includes them (e.g. compression) and sees the final body.
+
+    Args:
+        blueprint: Blueprint whose routes are measured
+        dataset_label: Returns the dataset the current request reads
+    """
+
+    @blueprint.before_request
+    def start_timing():
+        g.request_started = time.perf_counter()
+        start_request_timing()
+
+    @blueprint.after_request
+    def record_request(response: Response) -> Response:
+        if "request_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+
+        REQUEST_LATENCY.observe(elapsed, route=route, method=request.method, status=response.status_code, dataset=dataset_label())
+        stages = stage_times()
+        stages["other"] = max(elapsed - sum(stages.values()), 0.0)
+        for name, seconds in stages.items():
+            STAGE_LATENCY.observe(seconds, route=route, stage=name)
+        if not response.is_streamed and not response.direct_passthrough:
+            RESPONSE_SIZE.observe(len(response.get_data()), route=route)
+        for cache, result in g.get("cache_lookups", []):
+            CACHE_LOOKUPS.inc(route=route, cache=cache, result=result)
+        return response
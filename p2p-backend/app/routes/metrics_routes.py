@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from app.services.monitoring.metrics import REGISTRY
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Metrics are per process; with several gunicorn workers each scrape sees one of them
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, Response, current_app, g, make_response, request
+from werkzeug.datastructures import MultiDict
+from app.services.data.data_loader import LoadedDataset, load_current_dataset
+from app.services.execution.pool import PoolSaturated, ProcessPool, TaskTimeout
+from app.services.monitoring.metrics import REGISTRY
+from app.services.monitoring.stages import stage
+from .profiling import profiling
+
+POOL_WORKERS = int(os.environ.get("ANALYSIS_POOL_WORKERS", "0"))
+POOL_QUEUE = int(os.environ.get("ANALYSIS_POOL_QUEUE", str(2 * POOL_WORKERS)))
+TASK_TIMEOUT = float(os.environ.get("ANALYSIS_TASK_TIMEOUT", "30"))
+RETRY_AFTER = "1"
+
+POOL_TASKS = REGISTRY.counter("p2p_pool_tasks_total", "Requests handed to the analysis pool, by outcome", ("result",))
+POOL_IN_FLIGHT = REGISTRY.gauge("p2p_pool_tasks_in_flight", "Tasks running or queued in this worker's analysis pool")
+
+pool = ProcessPool(POOL_WORKERS, POOL_QUEUE, TASK_TIMEOUT) if POOL_WORKERS > 0 else None
+if pool is not None:
+    REGISTRY.add_collector(lambda: POOL_IN_FLIGHT.set(pool.stats()["in_flight"]))
+
+# Views that may run in the pool by name, and the app whose request context they run in there
+_views: Dict[str, Callable] = {}
+_app: Optional[Flask] = None
+
+
+@dataclass(frozen=True)
+class Task:
+    """What a pool worker needs to answer a request: the query, not the data."""
+
+    view: str
+    path: str
+    method: str
+    args: Tuple[Tuple[str, str], ...]
+    body: Optional[dict]
+    dataset_id: str
+    source: Tuple[int, int]
+
+
+def _execute(task: Task) -> Tuple[int, str, bytes]:
+    # Runs in a pool worker against its own copy of the dataset
+    with _app.test_request_context(task.path, method=task.method, query_string=MultiDict(task.args), json=task.body):
+        g.dataset = load_current_dataset(task.dataset_id, task.source)
+        response = make_response(_views[task.view](**request.view_args))
+        return response.status_code, response.mimetype, response.get_data()
+
+
+def start_pool(app: Flask) -> None:
+    """Fork the pool workers of this process now, e.g. from gunicorn's post_fork before requests arrive."""
+    global _app
+    if pool is not None:
+        _app = app
+        pool.start()
+
+
+def create_offloader(current_dataset: Callable[[], LoadedDataset]):
+    """
+    Decorator running a view's analysis and serialization in the analysis pool when
+    ANALYSIS_POOL_WORKERS is set, so heavy pandas work does not hold this process's GIL.
+
+    Only a small task descriptor goes to the worker and only the response body comes back.
+    When the pool is saturated the request is answered 503 with Retry-After right away.
+
+    Args:
+        current_dataset: Returns the dataset pinned to the current request
+    """
+
+    def offloaded(view):
+        _views[view.__name__] = view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            global _app
+            # A profiled request stays in this process, where its stacks are sampled
+            if pool is None or profiling():
+                return view(*args, **kwargs)
+            if _app is None:
+                _app = current_app._get_current_object()
+
+            dataset = current_dataset()
+            task = Task(
+                view=view.__name__,
+                path=request.path,
+                method=request.method,
+                args=tuple(request.args.items(multi=True)),
+                body=request.get_json(silent=True) if request.is_json else None,
+                dataset_id=dataset.dataset_id,
+                source=dataset.source,
+            )
+            try:
+                with stage("pool"):
+                    status, mimetype, body = pool.run(_execute, task)
+            except PoolSaturated:
+                POOL_TASKS.inc(result="rejected")
+                return {"error": "The server is busy, please retry shortly"}, 503, {"Retry-After": RETRY_AFTER}
+            except TaskTimeout:
+                POOL_TASKS.inc(result="timeout")
+                return {"error": f"The request took longer than {TASK_TIMEOUT:g}s"}, 504
+            except BrokenProcessPool:
+                POOL_TASKS.inc(result="error")
+                return {"error": "The analysis worker failed, please retry"}, 503, {"Retry-After": RETRY_AFTER}
+            POOL_TASKS.inc(result="ok")
+            return Response(body, status=status, mimetype=mimetype)
+
+        return wrapper
+
+    return offloaded
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import hmac
+import os
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Callable
+from flask import Blueprint, Response, g, has_request_context, request
+from app.services.monitoring.profiler import Profile, ProfileBuffer, StackSampler
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_HEADER = "X-Profile-Token"
+
+# Profiles of this worker process; /api/admin/profiles serves them
+PROFILES = ProfileBuffer(PROFILE_BUFFER_SIZE)
+
+
+def profile_requested() -> bool:
+    # PROFILE_TOKEN (or ADMIN_TOKEN) in X-Profile-Token profiles a request on demand;
+    # PROFILE_SAMPLE_RATE profiles that fraction of all requests
+    token = os.environ.get("PROFILE_TOKEN") or os.environ.get("ADMIN_TOKEN")
+    header = request.headers.get(PROFILE_HEADER)
+    if token and header is not None and hmac.compare_digest(header, token):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profiling() -> bool:
+    """Whether the current request is being profiled."""
+    return has_request_context() and "profiler" in g
+
+
+def init_profiling(blueprint: Blueprint, dataset_label: Callable[[], str]) -> None:
+    """
+    Sample the stacks of the requests of a blueprint that opt in, and keep the profiles in PROFILES.
+
+    Register it before the blueprint's other hooks, so the profile covers them too. The profile's
+    id is returned in the X-Profile-Id response header.
+
+    Args:
+        blueprint: Blueprint whose routes may be profiled
+        dataset_label: Returns the dataset the current request reads
+    """
+
+    @blueprint.before_request
+    def start_profiling():
+        if not profile_requested():
+            return
+        profile = Profile(
+            id=PROFILES.next_id(),
+            method=request.method,
+            path=request.full_path.rstrip("?"),
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            dataset="",
+            started=datetime.now(timezone.utc),
+            interval=PROFILE_INTERVAL,
+        )
+        g.profiler = StackSampler(profile, threading.get_ident())
+        g.profiler.start()
+
+    @blueprint.after_request
+    def tag_profile(response: Response) -> Response:
+        if "profiler" in g:
+            g.profile_status = response.status_code
+            response.headers["X-Profile-Id"] = g.profiler.profile.id
+        return response
+
+    @blueprint.teardown_request
+    def finish_profiling(error=None):
+        # Also runs when the view raised, so failing requests are kept too
+        if "profiler" not in g:
+            return
+        profile = g.profiler.stop(g.get("profile_status", 500))
+        profile.dataset = dataset_label()
+        PROFILES.add(profile)
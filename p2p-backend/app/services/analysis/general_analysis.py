@@ -1,16 +1,25 @@
 from flask import jsonify
+import numpy as np
 import pandas as pd
+from app.services.data.columns import minutes, select, with_minutes
+from app.services.monitoring.stages import instrumented
 
 
+@instrumented("analysis")
 class GeneralAnalysis:
     @staticmethod
-    def get_participation_by_year(df):
+    def get_participation_by_year(df, aggregates=None):
+        if aggregates is not None:
+            return aggregates.participation_by_year()
         return df.groupby("Year")["Name"].count()
 
     @staticmethod
-    def get_average_time_by_year(df):
-        avg_time = df.groupby("Year")["Time (min)"].mean()
-        overall_avg_time = df["Time (min)"].mean()
+    def get_average_time_by_year(df, aggregates=None):
+        if aggregates is not None:
+            return aggregates.average_time_by_year()
+        times = minutes(df)
+        avg_time = times.groupby(df["Year"]).mean()
+        overall_avg_time = times.mean()
         return avg_time, overall_avg_time
 
     @staticmethod
@@ -22,8 +31,10 @@ class GeneralAnalysis:
         return df["Region"].value_counts().head(10)
 
     @staticmethod
-    def get_time_percentiles(df):
-        return df["Time (min)"].quantile([0.25, 0.5, 0.75])
+    def get_time_percentiles(df, aggregates=None):
+        if aggregates is not None:
+            return aggregates.time_percentiles([0.25, 0.5, 0.75])
+        return minutes(df).quantile([0.25, 0.5, 0.75])
 
     @staticmethod
     def get_gender_distribution_by_year(df):
@@ -32,18 +43,45 @@ class GeneralAnalysis:
 
     @staticmethod
     def get_top_10_fastest_swimmers(df):
-        return df.nsmallest(10, "Time (min)")
+        return with_minutes(df.loc[minutes(df).nsmallest(10).index])
 
     @staticmethod
-    def get_average_time_by_age_group_and_year(df):
-        return df.groupby(["Year", "AgeGroup"])["Time (min)"].mean().unstack()
+    def get_average_time_by_age_group_and_year(df, aggregates=None):
+        if aggregates is not None:
+            return aggregates.average_time_by_age_group_and_year()
+        return minutes(df).groupby([df["Year"], df["AgeGroup"]]).mean().unstack()
 
     @staticmethod
     def get_age_vs_time_distribution(df):
-        return df[["Age", "Time (min)"]]
+        return select(df, ["Age", "Time (min)"])
 
     @staticmethod
-    def get_median_time_by_year(df):
-        median_time = df.groupby("Year")["Time (min)"].median()
-        overall_median_time = df["Time (min)"].median()
+    def get_age_vs_time_bins(df, age_bins=20, time_bins=40):
+        ages = df["Age"].to_numpy(dtype="float64", na_value=np.nan)
+        times = minutes(df).to_numpy(dtype="float64", na_value=np.nan)
+        valid = ~np.isnan(ages) & ~np.isnan(times)
+        counts, age_edges, time_edges = np.histogram2d(ages[valid], times[valid], bins=[age_bins, time_bins])
+        return counts.astype(np.int64), age_edges, time_edges
+
+    @staticmethod
+    def get_age_vs_time_sample(df, max_points=2000, seed=0):
+        # A uniform sample keeps the point density of the full scatter; the fixed seed keeps it stable across requests
+        data = select(df, ["Age", "Time (min)"]).dropna()
+        if len(data) > max_points:
+            positions = np.sort(np.random.default_rng(seed).choice(len(data), max_points, replace=False))
+            data = data.iloc[positions]
+        return data
+
+    @staticmethod
+    def get_rows_page(df, columns, offset, limit):
+        return select(df.iloc[offset : offset + limit], columns), len(df)
+
+    @staticmethod
+    def get_median_time_by_year(df, aggregates=None):
+        # The aggregate store answers medians from its quantile sketch, within 0.25% of the exact value
+        if aggregates is not None:
+            return aggregates.median_time_by_year()
+        times = minutes(df)
+        median_time = times.groupby(df["Year"]).median()
+        overall_median_time = times.median()
         return median_time, overall_median_time
@@ -1,11 +1,16 @@
 from flask import jsonify
+import numpy as np
 import pandas as pd
+from app.services.data.columns import minutes, with_minutes
+from app.services.data.indexes import PercentileEngine
+from app.services.monitoring.stages import instrumented
 
 
+@instrumented("analysis")
 class UserAnalysis:
     @staticmethod
-    def get_user_time_by_year(df, name):
-        person_data = df[df["Name"] == name]
+    def get_user_time_by_year(df, name, name_index=None):
+        person_data = UserAnalysis._select_person(df, name, name_index)
         if person_data.empty:
             return None, {
                 "error": True,
@@ -15,26 +20,25 @@ class UserAnalysis:
         return person_data, None
 
     @staticmethod
-    def get_user_time_percentile_by_year(df, name):
-        person_data = df[df["Name"] == name]
+    def get_user_time_percentile_by_year(df, name, name_index=None, percentile_engine=None):
+        person_data = UserAnalysis._select_person(df, name, name_index)
         if person_data.empty:
             return None, "No percentile data found for '{}'. This may be due to missing participation records.".format(name)
 
+        engine = percentile_engine or PercentileEngine(df)
         person_gender = person_data["Gender"].iloc[0]
-        percentiles_all = []
-        percentiles_gender = []
 
-        for year in person_data["Year"].unique():
-            yearly_data = df[df["Year"] == year]
-            yearly_data_gender = yearly_data[yearly_data["Gender"] == person_gender]
-            time = person_data[person_data["Year"] == year]["Time (min)"].values[0]
-            percentiles_all.append((year, UserAnalysis._calculate_percentile(yearly_data["Time (min)"], time)))
-            percentiles_gender.append((year, UserAnalysis._calculate_percentile(yearly_data_gender["Time (min)"], time)))
+        # First result of each year, answered as one batch per field
+        yearly = person_data.drop_duplicates("Year")
+        years = yearly["Year"].to_numpy()
+        times = yearly["Time (min)"].to_numpy(dtype="float64", na_value=np.nan)
+        percentiles_all = list(zip(years, engine.percentiles(years, times).tolist()))
+        percentiles_gender = list(zip(years, engine.percentiles(years, times, gender=person_gender).tolist()))
 
         return (person_data, person_gender, percentiles_all, percentiles_gender), None
 
     @staticmethod
-    def get_average_time_by_gender_age_group_and_year(df, gender, age_group, name=None):
+    def get_average_time_by_gender_age_group_and_year(df, gender, age_group, name=None, name_index=None):
         filtered_df = df[(df["Gender"] == gender) & (df["AgeGroup"] == age_group)]
         if filtered_df.empty:
             return None, {
@@ -43,12 +47,12 @@ class UserAnalysis:
                 "suggestion": "Try selecting a different gender or age group.",
             }
 
-        avg_time = filtered_df.groupby("Year")["Time (min)"].mean()
-        overall_avg_time = df.groupby("Year")["Time (min)"].mean()
+        avg_time = minutes(filtered_df).groupby(filtered_df["Year"]).mean()
+        overall_avg_time = minutes(df).groupby(df["Year"]).mean()
 
         user_data = None
         if name:
-            user_data = df[df["Name"] == name]
+            user_data = UserAnalysis._select_person(df, name, name_index)
             if user_data.empty:
                 return None, {
                     "error": True,
@@ -59,32 +63,124 @@ class UserAnalysis:
         return (avg_time, overall_avg_time, user_data), None
 
     @staticmethod
-    def find_user_position_in_year(df, name, year):
-        swimmer_data = df[(df["Name"] == name) & (df["Year"] == year)]
+    def find_user_position_in_year(df, name, year, name_index=None, percentile_engine=None):
+        person_data = UserAnalysis._select_person(df, name, name_index)
+        swimmer_data = person_data[person_data["Year"] == year]
         if swimmer_data.empty:
             return None, f"No data found for '{name}' in {year}."
 
+        engine = percentile_engine or PercentileEngine(df)
         best_time = swimmer_data["Time (min)"].min()
-        overall_rank = int((df[df["Year"] == year]["Time (min)"] < best_time).sum() + 1)
-
         age_group = str(swimmer_data["AgeGroup"].iloc[0])
         gender = swimmer_data["Gender"].iloc[0]
-        total_participants_in_age_group_and_gender = int(
-            len(df[(df["Year"] == year) & (df["AgeGroup"] == age_group) & (df["Gender"] == gender)])
-        )
 
         return {
             "name": name,
             "year": int(year),
-            "position": overall_rank,
-            "total_participants": int(len(df[df["Year"] == year])),
+            "position": engine.rank(year, best_time),
+            "total_participants": engine.participants(year),
+            "age_group": age_group,
+            "total_participants_in_age_group": engine.participants(year, gender, age_group),
+        }, None
+
+    @staticmethod
+    def find_user_rivals(df, name, year, k, name_index=None, percentile_engine=None):
+        positions = name_index.positions(name) if name_index is not None else np.flatnonzero(df["Name"] == name)
+        swimmer_data = with_minutes(df.iloc[positions])
+        swimmer_data = swimmer_data[(swimmer_data["Year"] == year) & swimmer_data["Time (min)"].notna()]
+        if swimmer_data.empty:
+            return None, f"No finishing time found for '{name}' in {year}."
+
+        engine = percentile_engine or PercentileEngine(df)
+        best = swimmer_data.iloc[swimmer_data["Time (min)"].to_numpy(dtype="float64").argmin()]
+        best_time = float(best["Time (min)"])
+        gender = best["Gender"]
+        age_group = str(best["AgeGroup"])
+
+        def field(gender=None, age_group=None):
+            ahead, behind = engine.rivals(year, best_time, k, gender, age_group, exclude=positions)
+            rivals = df.iloc[np.concatenate([ahead, behind])]
+            times = minutes(rivals).to_numpy(dtype="float64", na_value=np.nan)
+            places = engine.places(year, times, gender, age_group)
+            described = [
+                {"name": rival, "time": float(time), "position": int(place), "gender": rival_gender, "age_group": str(rival_age_group)}
+                for rival, time, place, rival_gender, rival_age_group in zip(
+                    rivals["Name"], times, places, rivals["Gender"], rivals["AgeGroup"]
+                )
+            ]
+            return {
+                "position": int(engine.places(year, [best_time], gender, age_group)[0]),
+                "total_participants": engine.participants(year, gender, age_group),
+                "ahead": described[: len(ahead)],
+                "behind": described[len(ahead) :],
+            }
+
+        return {
+            "name": name,
+            "year": int(year),
+            "time": best_time,
+            "gender": None if pd.isna(gender) else gender,
             "age_group": age_group,
-            "total_participants_in_age_group": total_participants_in_age_group_and_gender,
+            "overall": field(),
+            "gender_age_group": None if pd.isna(gender) else field(gender, age_group),
         }, None
 
     @staticmethod
-    def _calculate_percentile(series, value):
-        # For swimming, lower time is better, so we invert the percentile
-        # This way, being the fastest puts you in the 100th percentile
-        rank = (series >= value).mean() * 100
-        return float(rank)  # Convert numpy types to native Python float
+    def get_batch_summary(df, names, year=None, name_index=None, percentile_engine=None):
+        # One selection for the whole squad, then one batch of binary searches per metric
+        positions = [name_index.positions(name) if name_index is not None else np.flatnonzero(df["Name"] == name) for name in names]
+        missing = [name for name, rows in zip(names, positions) if len(rows) == 0]
+        found = [name for name, rows in zip(names, positions) if len(rows)]
+        if not found:
+            return None, {
+                "error": True,
+                "message": "None of the requested swimmers were found in the selected dataset.",
+                "missing": missing,
+            }
+
+        squad = with_minutes(df.iloc[np.concatenate(positions)])
+        if year is not None:
+            squad = squad[squad["Year"] == year]
+
+        engine = percentile_engine or PercentileEngine(df)
+        genders = squad.groupby("Name", observed=True, sort=False)["Gender"].first()
+        best = (
+            squad.groupby(["Name", "Year"], observed=True, sort=False)
+            .agg(time=("Time (min)", "min"), age_group=("AgeGroup", "first"))
+            .reset_index()
+        )
+        best["Gender"] = best["Name"].map(genders)
+
+        years = best["Year"].to_numpy(dtype="int64")
+        times = best["time"].to_numpy(dtype="float64", na_value=np.nan)
+        percentile_gender = np.full(len(best), np.nan)
+        for gender in best["Gender"].dropna().unique():
+            mask = (best["Gender"] == gender).to_numpy()
+            percentile_gender[mask] = engine.percentiles(years[mask], times[mask], gender=gender)
+        best["percentile"] = engine.percentiles(years, times)
+        best["percentile_gender"] = percentile_gender
+        best["position"] = engine.ranks(years, times)
+        best["total_participants"] = [engine.participants(y) for y in years]
+
+        order = {name: i for i, name in enumerate(found)}
+        best["order"] = best["Name"].map(order).astype("int64")
+        best = best.sort_values(["order", "Year"]).drop(columns="order")
+        return (best, missing), None
+
+    @staticmethod
+    def search_swimmers(df, query, search_index, name_index, limit=10):
+        candidates = []
+        for name, score, match in search_index.search(query, limit):
+            years = df["Year"].iloc[name_index.positions(name)].dropna().unique()
+            candidates.append(
+                {"name": name, "match": match, "score": round(score, 3), "years": sorted(int(year) for year in years)}
+            )
+        return candidates
+
+    @staticmethod
+    def _select_person(df, name, name_index=None):
+        # Index lookup is O(1); fall back to a column scan when no index is available
+        if name_index is None:
+            return with_minutes(df[df["Name"] == name])
+        return with_minutes(df.iloc[name_index.positions(name)])
+
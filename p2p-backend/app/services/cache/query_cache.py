@@ -0,0 +1,197 @@
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+import secrets
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from app.services.monitoring.stages import record_cache_lookup
+
+try:
+    import redis
+except ImportError:  # redis is optional; without it every worker keeps its own cache
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 300
+_SIGNATURE_BYTES = hashlib.sha256().digest_size
+
+
+class LRUBackend:
+    """
+    In-process byte store with least-recently-used eviction under a size cap and a TTL per entry.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, Tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+
+class RedisBackend:
+    """
+    Shared byte store, so every worker benefits from a hit any of them cached.
+    Eviction under the size cap is left to the server (maxmemory with an allkeys-lru policy).
+    """
+
+    def __init__(self, url: str, ttl: float = DEFAULT_TTL, prefix: str = "p2p:query:"):
+        self.ttl = ttl
+        self._prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key: Hashable) -> str:
+        return self._prefix + hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        try:
+            return self._client.get(self._key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Query cache read failed: {e}")
+            return None
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        try:
+            self._client.set(self._key(key), value, ex=int(self.ttl))
+        except redis.RedisError as e:
+            logger.warning(f"Query cache write failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            for key in self._client.scan_iter(f"{self._prefix}*"):
+                self._client.delete(key)
+        except redis.RedisError as e:
+            logger.warning(f"Query cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class QueryCache:
+    """
+    Caches serialized responses and analysis results of parameterized routes,
+    keyed on the normalized query and the state of the dataset's CSV, with hit rates per route.
+
+    Analysis results are pickled, so each one is stored with an HMAC of its key and bytes and
+    only unpickled when that matches; anything else in the backend is treated as a miss. Processes
+    sharing a backend need the same secret (QUERY_CACHE_SECRET), which preloaded gunicorn workers
+    inherit from the master by default.
+    """
+
+    def __init__(self, backend=None, secret: Optional[bytes] = None):
+        self.backend = backend or LRUBackend()
+        self._secret = secret or secrets.token_bytes(32)
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._lock = Lock()
+
+    def _record(self, route: str, hit: bool) -> None:
+        with self._lock:
+            (self._hits if hit else self._misses)[route] += 1
+
+    def get_response(self, route: str, key: Hashable) -> Optional[bytes]:
+        body = self.backend.get(("response", route, key))
+        self._record(route, body is not None)
+        return body
+
+    def set_response(self, route: str, key: Hashable, body: bytes) -> None:
+        self.backend.set(("response", route, key), body)
+
+    def _signature(self, key: Hashable, payload: bytes) -> bytes:
+        return hmac.new(self._secret, repr(key).encode() + b"\0" + payload, hashlib.sha256).digest()
+
+    def _verified(self, key: Hashable, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            return None
+        signature, payload = value[:_SIGNATURE_BYTES], value[_SIGNATURE_BYTES:]
+        if not hmac.compare_digest(signature, self._signature(key, payload)):
+            logger.warning("Ignoring a query cache result with an invalid signature")
+            return None
+        return payload
+
+    def memoize(self, route: str, key: Hashable, compute: Callable):
+        """Return the cached result of compute() for key, computing and storing it on a miss."""
+        entry_key = ("result", route, key)
+        cached = self._verified(entry_key, self.backend.get(entry_key))
+        self._record(f"{route}:result", cached is not None)
+        record_cache_lookup("result", cached is not None)
+        if cached is not None:
+            return pickle.loads(cached)
+        result = compute()
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self.backend.set(entry_key, self._signature(entry_key, payload) + payload)
+        return result
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route in sorted(set(self._hits) | set(self._misses)):
+                hits, misses = self._hits[route], self._misses[route]
+                routes[route] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return {**self.backend.stats(), "routes": routes}
+
+
+def create_query_cache() -> QueryCache:
+    """Backend from the environment: QUERY_CACHE_URL selects Redis, otherwise an in-process LRU."""
+    ttl = float(os.environ.get("QUERY_CACHE_TTL", DEFAULT_TTL))
+    url = os.environ.get("QUERY_CACHE_URL")
+    secret = os.environ.get("QUERY_CACHE_SECRET")
+    secret = secret.encode() if secret else None
+    if url:
+        if redis is not None:
+            return QueryCache(RedisBackend(url, ttl), secret)
+        logger.warning("QUERY_CACHE_URL is set but redis is not installed; using the in-process cache")
+    return QueryCache(LRUBackend(int(os.environ.get("QUERY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)), ttl), secret)
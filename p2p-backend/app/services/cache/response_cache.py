@@ -0,0 +1,46 @@
+from __future__ import annotations
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Keeps the serialized body of a response per key, tagged with the data version it was built from.
+    A lookup with a newer version misses, so a reload invalidates entries without an explicit flush.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[int, bytes]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        with self._lock:
+            if entry is not None and entry[0] == version:
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+        return None
+
+    def set(self, key: Hashable, version: int, body: bytes) -> None:
+        with self._lock:
+            current = self._entries.get(key)
+            # Never let a slow request for an old version overwrite a newer entry
+            if current is None or current[0] <= version:
+                self._entries[key] = (version, body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
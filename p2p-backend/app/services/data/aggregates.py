@@ -0,0 +1,169 @@
+from __future__ import annotations
+import math
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .columns import minutes
+
+CellKey = Tuple[Optional[int], Optional[str], Optional[str]]
+
+
+def _key(value) -> Optional[Hashable]:
+    return None if pd.isna(value) else value
+
+
+class AggregateStore:
+    """
+    Running per-cell aggregates of a dataset, one cell per Year x Gender x AgeGroup.
+
+    Each cell holds row/name/time counts, the sum of Time (min) and a log-bucketed quantile
+    sketch (as in DDSketch): bucket k counts times in (gamma^(k-1), gamma^k], so any quantile is
+    answered within RELATIVE_ACCURACY of the exact value. Counts, sums and sketches of cells add
+    up, so appending rows only touches the cells those rows fall into.
+    """
+
+    RELATIVE_ACCURACY = 0.0025
+    MIN_TIME = 1.0
+    MAX_TIME = 2000.0
+
+    _GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _OFFSET = math.floor(math.log(MIN_TIME) / math.log(_GAMMA))
+    _BUCKETS = math.ceil(math.log(MAX_TIME) / math.log(_GAMMA)) - _OFFSET + 1
+
+    def __init__(self, df: pd.DataFrame):
+        self._cells: Dict[CellKey, int] = {}
+        self._keys: List[CellKey] = []
+        self._age_group_dtype = df["AgeGroup"].dtype
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.names = np.zeros(0, dtype=np.int64)
+        self.timed = np.zeros(0, dtype=np.int64)
+        self.time_sum = np.zeros(0, dtype=np.float64)
+        self.sketch = np.zeros((0, self._BUCKETS), dtype=np.int32)
+        self._add(df)
+
+    def updated(self, rows: pd.DataFrame) -> "AggregateStore":
+        """Copy of the store with rows added; only the cells they fall into change."""
+        store = AggregateStore.__new__(AggregateStore)
+        store._cells = dict(self._cells)
+        store._keys = list(self._keys)
+        store._age_group_dtype = self._age_group_dtype
+        for name in ("rows", "names", "timed", "time_sum", "sketch"):
+            setattr(store, name, getattr(self, name).copy())
+        store._add(rows)
+        return store
+
+    def _add(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        grouped = pd.DataFrame(
+            {"Year": df["Year"], "Gender": df["Gender"], "AgeGroup": df["AgeGroup"]}
+        ).groupby(["Year", "Gender", "AgeGroup"], dropna=False, observed=True, sort=True)
+        group_ids = grouped.ngroup().to_numpy()
+
+        group_cells = []
+        for key in grouped.size().index:
+            key = tuple(_key(part) for part in key)
+            if key[0] is not None:
+                key = (int(key[0]),) + key[1:]
+            if key not in self._cells:
+                self._cells[key] = len(self._keys)
+                self._keys.append(key)
+            group_cells.append(self._cells[key])
+        self._grow(len(self._keys))
+        cells = np.asarray(group_cells, dtype=np.int64)[group_ids]
+
+        times = minutes(df).to_numpy(dtype="float64", na_value=np.nan)
+        has_time = ~np.isnan(times)
+        n = len(self._keys)
+        self.rows += np.bincount(cells, minlength=n)
+        self.names += np.bincount(cells, weights=df["Name"].notna().to_numpy(), minlength=n).astype(np.int64)
+        self.timed += np.bincount(cells[has_time], minlength=n)
+        self.time_sum += np.bincount(cells[has_time], weights=times[has_time], minlength=n)
+
+        buckets = self._bucket(times[has_time])
+        flat = np.bincount(cells[has_time] * self._BUCKETS + buckets, minlength=n * self._BUCKETS)
+        self.sketch += flat.reshape(n, self._BUCKETS).astype(np.int32)
+
+    def _grow(self, n: int) -> None:
+        extra = n - len(self.rows)
+        if extra <= 0:
+            return
+        self.rows = np.concatenate([self.rows, np.zeros(extra, dtype=np.int64)])
+        self.names = np.concatenate([self.names, np.zeros(extra, dtype=np.int64)])
+        self.timed = np.concatenate([self.timed, np.zeros(extra, dtype=np.int64)])
+        self.time_sum = np.concatenate([self.time_sum, np.zeros(extra, dtype=np.float64)])
+        self.sketch = np.concatenate([self.sketch, np.zeros((extra, self._BUCKETS), dtype=np.int32)])
+
+    @classmethod
+    def _bucket(cls, times: np.ndarray) -> np.ndarray:
+        clipped = np.clip(times, cls.MIN_TIME, cls.MAX_TIME)
+        return np.ceil(np.log(clipped) / math.log(cls._GAMMA)).astype(np.int64) - cls._OFFSET
+
+    @classmethod
+    def _quantile(cls, counts: np.ndarray, q: float) -> float:
+        """Quantile with the same linear interpolation between order statistics as pandas."""
+        total = int(counts.sum())
+        if total == 0:
+            return float("nan")
+        cumulative = np.cumsum(counts)
+        rank = q * (total - 1)
+        lower, upper = math.floor(rank), math.ceil(rank)
+        bucket_lower, bucket_upper = np.searchsorted(cumulative, [lower, upper], side="right")
+        value_lower, value_upper = cls._bucket_value(bucket_lower), cls._bucket_value(bucket_upper)
+        return value_lower + (value_upper - value_lower) * (rank - lower)
+
+    @classmethod
+    def _bucket_value(cls, bucket: int) -> float:
+        return 2 * cls._GAMMA ** (bucket + cls._OFFSET) / (cls._GAMMA + 1)
+
+    def _rollup(self, fields: Sequence[int]):
+        """Sum the cells over every key component except fields; cells with no year are dropped."""
+        keys = {tuple(key[i] for i in fields) for key in self._keys if key[0] is not None}
+        keys = sorted(keys, key=lambda k: tuple((part is None, part) for part in k))
+        position = {key: i for i, key in enumerate(keys)}
+        mapping = np.array([position.get(tuple(key[i] for i in fields), -1) for key in self._keys], dtype=np.int64)
+        valid = mapping >= 0
+
+        def total(values):
+            out = np.zeros((len(keys),) + values.shape[1:], dtype=values.dtype)
+            np.add.at(out, mapping[valid], values[valid])
+            return out
+
+        return keys, total(self.names), total(self.timed), total(self.time_sum), total(self.sketch)
+
+    def _year_index(self, keys) -> pd.Index:
+        return pd.Index([key[0] for key in keys], name="Year")
+
+    def participation_by_year(self) -> pd.Series:
+        keys, names, _, _, _ = self._rollup([0])
+        return pd.Series(names, index=self._year_index(keys), name="Name")
+
+    def average_time_by_year(self) -> Tuple[pd.Series, float]:
+        keys, _, timed, time_sum, _ = self._rollup([0])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = time_sum / timed
+        overall = self.time_sum.sum() / self.timed.sum() if self.timed.sum() else float("nan")
+        return pd.Series(averages, index=self._year_index(keys), name="Time (min)"), float(overall)
+
+    def median_time_by_year(self) -> Tuple[pd.Series, float]:
+        keys, _, _, _, sketch = self._rollup([0])
+        medians = [self._quantile(counts, 0.5) for counts in sketch]
+        overall = self._quantile(self.sketch.sum(axis=0), 0.5)
+        return pd.Series(medians, index=self._year_index(keys), name="Time (min)"), overall
+
+    def time_percentiles(self, quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> pd.Series:
+        counts = self.sketch.sum(axis=0)
+        return pd.Series([self._quantile(counts, q) for q in quantiles], index=list(quantiles), name="Time (min)")
+
+    def average_time_by_age_group_and_year(self) -> pd.DataFrame:
+        keys, _, timed, time_sum, _ = self._rollup([0, 2])
+        years = sorted({year for year, _ in keys})
+        table = pd.DataFrame(
+            np.nan,
+            index=pd.Index(years, name="Year"),
+            columns=pd.CategoricalIndex(self._age_group_dtype.categories, dtype=self._age_group_dtype, name="AgeGroup"),
+        )
+        for (year, age_group), count, total in zip(keys, timed, time_sum):
+            if age_group is not None and count:
+                table.loc[year, age_group] = total / count
+        return table
@@ -0,0 +1,25 @@
+from typing import Sequence
+import pandas as pd
+
+TIME_MIN = "Time (min)"
+
+
+def minutes(df: pd.DataFrame) -> pd.Series:
+    """Time (min) of every row: the stored column, or derived from Time (ms) for compact datasets."""
+    if TIME_MIN in df.columns:
+        return df[TIME_MIN]
+    return (df["Time (ms)"] / 60000.0).rename(TIME_MIN)
+
+
+def select(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """df[columns], deriving Time (min) when it is asked for but not stored."""
+    if TIME_MIN not in columns or TIME_MIN in df.columns:
+        return df[list(columns)]
+    return pd.DataFrame({column: minutes(df) if column == TIME_MIN else df[column] for column in columns})
+
+
+def with_minutes(df: pd.DataFrame) -> pd.DataFrame:
+    """df with a Time (min) column. Copies the frame when deriving it, so keep this for small selections."""
+    if TIME_MIN in df.columns:
+        return df
+    return df.assign(**{TIME_MIN: minutes(df)})
@@ -1,9 +1,13 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import requests
 import pandas as pd
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +31,200 @@ class SwimResult:
     race_date: datetime
 
 
+class ResultColumns:
+    """
+    Growable typed column buffers for parsed results.
+
+    Numeric fields go straight into preallocated NumPy arrays (with a missing-value mask),
+    so a row is never materialised as a SwimResult or dict.
+    """
+
+    INT_FIELDS = ["place", "time", "age", "overall_rank", "gender_rank"]
+    OBJECT_FIELDS = ["name", "gender", "bib", "country", "locality", "region"]
+
+    def __init__(self, race_date: datetime, capacity: int = 1024):
+        self.race_date = race_date
+        self.size = 0
+        self._ints = {name: np.zeros(capacity, dtype=np.int64) for name in self.INT_FIELDS}
+        self._missing = {name: np.zeros(capacity, dtype=bool) for name in self.INT_FIELDS}
+        self._objects = {name: np.empty(capacity, dtype=object) for name in self.OBJECT_FIELDS}
+        self._pace = np.zeros(capacity, dtype=np.float32)
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._pace)
+        if self.size + rows <= capacity:
+            return
+        while capacity < self.size + rows:
+            capacity *= 2
+
+        def grow(array):
+            grown = np.zeros(capacity, dtype=array.dtype) if array.dtype != object else np.empty(capacity, dtype=object)
+            grown[: self.size] = array[: self.size]
+            return grown
+
+        self._ints = {name: grow(array) for name, array in self._ints.items()}
+        self._missing = {name: grow(array) for name, array in self._missing.items()}
+        self._objects = {name: grow(array) for name, array in self._objects.items()}
+        self._pace = grow(self._pace)
+
+    def append_page(self, raw_results: List[Dict[str, Any]]) -> None:
+        self._reserve(len(raw_results))
+        ints, missing, objects, pace = self._ints, self._missing, self._objects, self._pace
+        int_columns = [(ints[name], missing[name]) for name in self.INT_FIELDS]
+        object_columns = [objects[name] for name in self.OBJECT_FIELDS]
+        i = self.size
+        for result in raw_results:
+            time_ms = result.get("time", {}).get("timeInMillis")
+            rank = result.get("overallRank")
+            pace[i] = ResultsFetcher._calculate_pace(result, time_ms or 0)
+            # Same order as INT_FIELDS / OBJECT_FIELDS
+            int_values = (rank, time_ms, result.get("age"), rank, result.get("genderRank"))
+            for (values, mask), value in zip(int_columns, int_values):
+                if value is None:
+                    mask[i] = True
+                else:
+                    values[i] = value
+            object_values = (
+                result.get("displayName", "").lower(),
+                result.get("gender"),
+                result.get("bib"),
+                result.get("country"),
+                result.get("locality"),
+                result.get("region"),
+            )
+            for column, value in zip(object_columns, object_values):
+                column[i] = value
+            i += 1
+        self.size = i
+
+    def _int_column(self, name: str):
+        values, missing = self._ints[name][: self.size], self._missing[name][: self.size]
+        if missing.any():
+            # Same as the row-wise path: a missing value leaves the column as float64
+            column = values.astype(np.float64)
+            column[missing] = np.nan
+            return column
+        return pd.to_numeric(values, downcast="integer")
+
+    def to_frame(self) -> pd.DataFrame:
+        columns = {}
+        for f in fields(SwimResult):
+            if f.name in self._ints:
+                columns[f.name] = self._int_column(f.name)
+            elif f.name in self._objects:
+                columns[f.name] = self._objects[f.name][: self.size]
+            elif f.name == "pace":
+                columns[f.name] = self._pace[: self.size]
+            else:
+                columns[f.name] = np.full(self.size, np.datetime64(pd.Timestamp(self.race_date), "ns"))
+        return pd.DataFrame(columns, copy=False)
+
+
+@dataclass
+class PageStats:
+    """Timing and outcome of a single page request"""
+
+    event_id: str
+    event_course_id: str
+    offset: int
+    attempts: int = 0
+    elapsed: float = 0.0
+    results: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class FetchStats:
+    """Per-page stats collected over one fetch call"""
+
+    pages: List[PageStats] = field(default_factory=list)
+    failed_courses: List[Tuple[str, str]] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = sorted(page.elapsed for page in self.pages)
+        return {
+            "pages": len(self.pages),
+            "results": sum(page.results for page in self.pages),
+            "retries": sum(max(page.attempts - 1, 0) for page in self.pages),
+            "failed_pages": sum(1 for page in self.pages if page.error),
+            "failed_courses": len(self.failed_courses),
+            "page_time_p50": elapsed[len(elapsed) // 2] if elapsed else 0.0,
+            "page_time_max": elapsed[-1] if elapsed else 0.0,
+        }
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class FetchError(requests.RequestException):
+    """Raised when a page still fails after all retries"""
+
+
+@dataclass
+class _CourseState:
+    pages: Dict[int, List[Dict[str, Any]]] = field(default_factory=dict)
+    next_offset: int = 0
+    end: Optional[int] = None
+    in_flight: int = 0
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def error(self) -> Optional[str]:
+        # Failed pages at or past the end of the course do not matter; the end may be found
+        # after they failed, so this is checked against the current end every time
+        failed = [offset for offset in self.errors if self.end is None or offset < self.end]
+        return self.errors[min(failed)] if failed else None
+
+
 class ResultsFetcher:
     """Handles fetching and processing of swim results"""
 
-    def __init__(self, base_url: str = "https://results.athlinks.com"):
+    def __init__(
+        self,
+        base_url: str = "https://results.athlinks.com",
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        concurrency: int = 4,
+        rate: Optional[float] = None,
+    ):
+        """
+        Args:
+            base_url: Results API root, e.g. a local stub server in tests
+            timeout: Seconds to wait for each HTTP request
+            max_retries: Extra attempts for a page after a failed request
+            backoff: Base delay in seconds, doubled after every failed attempt
+            concurrency: Page requests kept in flight by the concurrent fetch modes
+            rate: Maximum requests per second across all threads, unlimited if None
+        """
         self.base_url = base_url
         self.session = requests.Session()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.rate_limiter = TokenBucket(rate) if rate else None
+        self._local = threading.local()
 
     def fetch_swim_results(self, event_id: str, event_course_id: str, limit: int = 100) -> List[Dict[str, Any]]:
         """
@@ -46,35 +238,180 @@ class ResultsFetcher:
         Returns:
             List of raw result dictionaries
         """
-        from_value = 0
         all_results = []
+        for results in self.iter_pages(event_id, event_course_id, limit):
+            all_results.extend(results)
+            logger.info(f"Fetched {len(results)} results. Total: {len(all_results)}")
 
-        try:
-            while True:
-                url = f"{self.base_url}/event/{event_id}"
-                params = {"eventCourseId": event_course_id, "from": from_value, "limit": limit}
+        return all_results
 
-                response = self.session.get(url, params=params)
-                response.raise_for_status()
+    def fetch_swim_results_concurrent(self, event_id: str, event_course_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Fetch all pages of one course, keeping up to `concurrency` page requests in flight
 
-                data = response.json()
-                if not self._validate_response(data):
-                    break
+        Args:
+            event_id: The ID of the event
+            event_course_id: The course ID
+            limit: Number of results per page
 
-                results = data[0]["interval"]["intervalResults"]
-                if not results:
+        Returns:
+            List of raw result dictionaries, in the same order as fetch_swim_results
+
+        Raises:
+            FetchError: A page still failed after all retries
+        """
+        results, _ = self.fetch_many([(event_id, event_course_id)], limit)
+        if (event_id, event_course_id) not in results:
+            raise FetchError(f"Failed to fetch event {event_id} course {event_course_id}")
+        return results[(event_id, event_course_id)]
+
+    def fetch_many(
+        self, courses: Iterable[Tuple[str, str]], limit: int = 100
+    ) -> Tuple[Dict[Tuple[str, str], List[Dict[str, Any]]], FetchStats]:
+        """
+        Fetch many (event_id, event_course_id) pairs in parallel under one concurrency limit
+
+        Pages past the end of a course are requested speculatively; the first empty page marks
+        the end, and no further offsets are requested for that course. A course whose page fails
+        after all retries is logged, listed in the stats' failed_courses and left out of the result.
+
+        Args:
+            courses: (event_id, event_course_id) pairs
+            limit: Number of results per page
+
+        Returns:
+            Raw results per course, and the stats of this call
+        """
+        states = {course: _CourseState() for course in dict.fromkeys(courses)}
+        stats = FetchStats()
+        in_flight: Dict[Future, Tuple[Tuple[str, str], int]] = {}
+
+        def open_courses():
+            return [
+                course
+                for course, state in states.items()
+                if state.error is None and (state.end is None or state.next_offset < state.end)
+            ]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                # Top up the pipeline, spreading slots over the courses that still have pages
+                while len(in_flight) < self.concurrency:
+                    candidates = open_courses()
+                    if not candidates:
+                        break
+                    course = min(candidates, key=lambda c: states[c].in_flight)
+                    state = states[course]
+                    future = pool.submit(self._fetch_page, course[0], course[1], state.next_offset, limit, stats)
+                    in_flight[future] = (course, state.next_offset)
+                    state.in_flight += 1
+                    state.next_offset += limit
+
+                if not in_flight:
                     break
 
-                all_results.extend(results)
-                from_value += limit
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    course, offset = in_flight.pop(future)
+                    state = states[course]
+                    state.in_flight -= 1
+                    try:
+                        page = future.result()
+                    except FetchError as e:
+                        if state.end is None or offset < state.end:
+                            state.errors[offset] = str(e)
+                        continue
+                    if page:
+                        state.pages[offset] = page
+                    elif state.end is None or offset < state.end:
+                        state.end = offset
 
-                logger.info(f"Fetched {len(results)} results. Total: {len(all_results)}")
+        results = {}
+        for course, state in states.items():
+            if state.error is not None:
+                logger.error(f"Giving up on event {course[0]} course {course[1]}: {state.error}")
+                stats.failed_courses.append(course)
+                continue
+            offsets = sorted(offset for offset in state.pages if state.end is None or offset < state.end)
+            results[course] = [result for offset in offsets for result in state.pages[offset]]
+            logger.info(f"Fetched {len(results[course])} results for event {course[0]} course {course[1]}")
+        return results, stats
 
-        except requests.RequestException as e:
-            logger.error(f"API request failed: {str(e)}")
-            raise
+    def _get_session(self) -> requests.Session:
+        # requests.Session is not guaranteed thread-safe, so worker threads get their own
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
 
-        return all_results
+    def _fetch_page(
+        self, event_id: str, event_course_id: str, offset: int, limit: int, fetch_stats: Optional[FetchStats] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch one page, retrying failed requests with exponential backoff; its PageStats are
+        added to fetch_stats when given
+
+        Returns:
+            The page's results; empty when the response has no results section
+
+        Raises:
+            FetchError: The page still failed after all retries
+        """
+        url = f"{self.base_url}/event/{event_id}"
+        params = {"eventCourseId": event_course_id, "from": offset, "limit": limit}
+        stats = PageStats(event_id=event_id, event_course_id=event_course_id, offset=offset)
+        if fetch_stats is not None:
+            fetch_stats.pages.append(stats)
+        started = time.perf_counter()
+
+        try:
+            while True:
+                stats.attempts += 1
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                try:
+                    response = self._get_session().get(url, params=params, timeout=self.timeout)
+                    response.raise_for_status()
+                    data = response.json()
+                except (requests.RequestException, ValueError) as e:
+                    if stats.attempts > self.max_retries or not self._is_retryable(e):
+                        stats.error = str(e)
+                        logger.error(f"API request failed: {str(e)}")
+                        raise FetchError(f"Page from={offset} failed after {stats.attempts} attempts: {e}") from e
+                    delay = self.backoff * 2 ** (stats.attempts - 1)
+                    logger.warning(f"API request failed ({str(e)}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+
+                results = data[0]["interval"]["intervalResults"] if self._validate_response(data) else []
+                stats.results = len(results)
+                return results
+        finally:
+            stats.elapsed = time.perf_counter() - started
+
+    def iter_pages(
+        self, event_id: str, event_course_id: str, limit: int = 100, stats: Optional[FetchStats] = None
+    ) -> Iterable[List[Dict[str, Any]]]:
+        """
+        Yield the pages of one course as they arrive
+
+        Args:
+            event_id: The ID of the event
+            event_course_id: The course ID
+            limit: Number of results per page
+            stats: Collects the stats of every page requested, if given
+
+        Yields:
+            Non-empty lists of raw result dictionaries
+        """
+        from_value = 0
+        while True:
+            results = self._fetch_page(event_id, event_course_id, from_value, limit, stats)
+            if not results:
+                return
+            yield results
+            from_value += limit
 
     def parse_results(self, raw_results: List[Dict[str, Any]], race_date: datetime) -> pd.DataFrame:
         """
@@ -87,28 +424,35 @@ class ResultsFetcher:
         Returns:
             Processed DataFrame
         """
-        # Process all results at once instead of loop
-        processed_data = [
-            SwimResult(
-                place=result.get("overallRank"),
-                name=result.get("displayName", "").lower(),
-                gender=result.get("gender"),
-                pace=self._calculate_pace(result),
-                time=result.get("time", {}).get("timeInMillis"),
-                age=result.get("age"),
-                bib=result.get("bib"),
-                country=result.get("country"),
-                locality=result.get("locality"),
-                region=result.get("region"),
-                overall_rank=result.get("overallRank"),
-                gender_rank=result.get("genderRank"),
-                race_date=race_date,
-            ).__dict__
-            for result in raw_results
-        ]
-
-        df = pd.DataFrame(processed_data)
-        return self._optimize_dtypes(df)
+        return self.parse_results_stream([raw_results], race_date)
+
+    def parse_results_stream(self, pages: Iterable[List[Dict[str, Any]]], race_date: datetime) -> pd.DataFrame:
+        """
+        Parse pages of raw results into typed column buffers as they arrive
+
+        Args:
+            pages: Pages of raw result dictionaries, e.g. from iter_pages
+            race_date: Date of the race
+
+        Returns:
+            DataFrame with the same columns and dtypes as parse_results
+        """
+        columns = ResultColumns(race_date)
+        for page in pages:
+            columns.append_page(page)
+        return columns.to_frame()
+
+    def fetch_and_parse(self, event_id: str, event_course_id: str, race_date: datetime, limit: int = 100) -> pd.DataFrame:
+        """Fetch one course and parse it page by page without holding all raw results"""
+        return self.parse_results_stream(self.iter_pages(event_id, event_course_id, limit), race_date)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Client errors other than 429 will fail the same way again"""
+        response = getattr(error, "response", None)
+        if not isinstance(error, requests.HTTPError) or response is None:
+            return True
+        return response.status_code >= 500 or response.status_code == 429
 
     def _validate_response(self, data: List[Dict[str, Any]]) -> bool:
         """
@@ -123,22 +467,10 @@ class ResultsFetcher:
         return data and isinstance(data, list) and len(data) > 0 and "interval" in data[0] and "intervalResults" in data[0]["interval"]
 
     @staticmethod
-    def _calculate_pace(result: Dict[str, Any]) -> float:
+    def _calculate_pace(result: Dict[str, Any], time: int) -> float:
         """Calculate pace in minutes per mile"""
-        time = result.get("time", {}).get("timeInMillis", 0)
         if "pace" in result and "time" in result["pace"]:
             return (result["pace"]["time"]["timeInMillis"] if result["pace"]["distance"]["distanceUnit"] != "100m" else time) / (
                 2 * 60 * 1000
             )
         return time / (2 * 60 * 1000)
-
-    @staticmethod
-    def _optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
-        """Optimize DataFrame memory usage"""
-        numeric_columns = ["place", "time", "age", "overall_rank", "gender_rank"]
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], downcast="integer")
-
-        df["pace"] = df["pace"].astype("float32")
-        return df
@@ -1,7 +1,19 @@
 from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from threading import Lock, Thread
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import time
 import pandas as pd
 import logging
+from .aggregates import AggregateStore
+from .indexes import NameIndex, NameSearchIndex, PercentileEngine
+from .ingestion import append_csv_rows, to_csv_rows
+from .snapshot import SNAPSHOT_DIRNAME, read_snapshot, write_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -18,38 +30,597 @@ DTYPES = {
     "Time (ms)": "Int64",
 }
 
+# Compact storage: names dictionary-encoded, numbers in the narrowest integer types that hold them
+COMPACT_DTYPES = {
+    "Name": "category",
+    "Age": "Int8",
+    "Time (ms)": "Int32",
+    "Year": "int16",
+}
+COMPACT_VARIANT = "compact"
+
+# Every <id>-swim_results.csv in the data directory is a dataset, e.g. competitive,
+# non-competitive or <event_id>-<event_course_id> for a single course
+DATASET_SUFFIX = "-swim_results.csv"
+DATASET_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+DEFAULT_DATASET = "competitive"
+PRELOAD_DATASETS = ("competitive", "non-competitive")
+
+
+class UnknownDataset(LookupError):
+    pass
+
+
+class AlreadyIngested(ValueError):
+    pass
+
+
+def dataset_path(data_dir: Path, dataset_id: str) -> Path:
+    if not DATASET_ID.fullmatch(dataset_id):
+        raise UnknownDataset(f"Invalid dataset id '{dataset_id}'")
+    return data_dir / f"{dataset_id}{DATASET_SUFFIX}"
+
+
+def derive_columns(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    # Derive once at load time
+    df["Year"] = df["RaceDate"].dt.year
+    if not compact:
+        df["Time (min)"] = df["Time (ms)"] / 60000.0
+    df["AgeGroup"] = pd.cut(df["Age"].astype("float"), bins=AGE_BINS, labels=AGE_LABELS, right=False).astype("category")
+    if compact:
+        # Time (min) is not stored; columns.minutes derives it from Time (ms) where it is needed
+        df = df.astype(COMPACT_DTYPES)
+    return df
+
+
+def append_rows(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate rows onto a dataset, widening categorical columns instead of degrading them to object."""
+    rows = rows[df.columns]
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            unseen = pd.Index(rows[column].dropna().unique()).difference(dtype.categories)
+            if len(unseen):
+                dtype = pd.CategoricalDtype(dtype.categories.append(unseen), ordered=dtype.ordered)
+                df = df.assign(**{column: df[column].cat.set_categories(dtype.categories)})
+        rows = rows.assign(**{column: rows[column].astype(dtype)})
+    return pd.concat([df, rows], ignore_index=True)
+
+
+@dataclass(frozen=True)
+class LoadedDataset:
+    """
+    A dataset together with everything derived from it. It is never mutated:
+    reloads and ingestion build a new one and swap it in as a whole.
+    """
+
+    dataset_id: str
+    df: pd.DataFrame
+    name_index: NameIndex
+    search_index: NameSearchIndex
+    percentile_engine: PercentileEngine
+    aggregates: AggregateStore
+    version: int
+    last_modified: datetime
+    load_seconds: float = 0.0
+    memory_bytes: int = 0
+    compact: bool = False
+    # Size and mtime of the CSV this version reflects
+    source: Tuple[int, int] = (0, 0)
+
+    def data(self) -> pd.DataFrame:
+        # Compact frames are handed out as-is, so callers must not modify them
+        if self.compact:
+            return self.df
+        # Shallow copy prevents accidental in-place edits from leaking back
+        return self.df.copy(deep=False)
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
 
 class SwimDataService:
     """
-    Loads both CSVs once at startup and keeps them in memory.
+    Registry of the datasets in a data directory, loaded on first use and kept in memory.
+    When the loaded datasets outgrow the memory budget the least recently used ones are dropped;
+    they are loaded again (from their snapshot) the next time a request asks for them.
+
+    A columnar snapshot with the derived columns is preferred over the CSV while it is fresh.
+
+    With mmap enabled the columns are memory-mapped from the snapshot read-only, so processes
+    forked after loading (gunicorn with preload_app) share one physical copy of the data.
+
+    In compact mode names are stored as integer codes into one shared string table, numeric
+    columns in int8/int16/int32 and Time (min) is derived from Time (ms) when it is read,
+    which takes a row from over 100 bytes down to about 20 plus the distinct names.
     """
 
-    def __init__(self, data_dir: str = "./data"):
+    def __init__(
+        self,
+        data_dir: str = "./data",
+        use_snapshots: bool = True,
+        mmap: bool = False,
+        compact: bool = False,
+        memory_budget: Optional[int] = None,
+        preload: Iterable[str] = PRELOAD_DATASETS,
+    ):
         self._data_dir = Path(data_dir)
-        logger.info("Loading swim competition datasets…")
-        self._competitive = self._load("competitive-swim_results.csv")
-        self._non_competitive = self._load("non-competitive-swim_results.csv")
-        logger.info("Datasets loaded successfully")
+        self._use_snapshots = use_snapshots or mmap
+        self._mmap = mmap
+        self._compact = compact
+        self._variant = COMPACT_VARIANT if compact else ""
+        self._memory_budget = memory_budget
+        # Loaded datasets, least recently used first
+        self._datasets: "OrderedDict[str, LoadedDataset]" = OrderedDict()
+        # Last version handed out per dataset and the state of its CSV at the time
+        self._versions: Dict[str, Tuple[int, Tuple[int, int], datetime]] = {}
+        self._evictions = 0
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._snapshot_lock = Lock()
+        self._reload_lock = Lock()
+        self._reload_status: dict = {"running": False}
+        self._watcher_pid: Optional[int] = None
+        for dataset_id in preload:
+            if self.exists(dataset_id):
+                self.get_dataset(dataset_id)
+            else:
+                logger.warning(f"Not preloading dataset '{dataset_id}': {dataset_path(self._data_dir, dataset_id)} does not exist")
 
-    def _load(self, filename: str) -> pd.DataFrame:
-        fp = self._data_dir / filename
-        df = pd.read_csv(fp, usecols=USECOLS, dtype=DTYPES, parse_dates=["RaceDate"]).copy()
+    def dataset_ids(self) -> List[str]:
+        """Ids of every dataset in the data directory, loaded or not."""
+        ids = (path.name[: -len(DATASET_SUFFIX)] for path in self._data_dir.glob(f"*{DATASET_SUFFIX}"))
+        return sorted(dataset_id for dataset_id in ids if DATASET_ID.fullmatch(dataset_id))
 
-        # Derive once at load time
-        df["Year"] = df["RaceDate"].dt.year
-        df["Time (min)"] = df["Time (ms)"] / 60000.0
-        df["AgeGroup"] = pd.cut(df["Age"].astype("float"), bins=AGE_BINS, labels=AGE_LABELS, right=False).astype("category")
+    def exists(self, dataset_id: str) -> bool:
+        try:
+            return dataset_path(self._data_dir, dataset_id).is_file()
+        except UnknownDataset:
+            return False
+
+    def reload(self, dataset_ids: Optional[Iterable[str]] = None, trigger: str = "manual") -> Dict[str, dict]:
+        """
+        Re-read datasets and bump their data versions so cached results go stale.
+
+        Each dataset and everything derived from it is built next to the current version and
+        swapped in once complete: readers are never blocked, requests already holding the
+        current version finish on it, and a dataset that fails to load keeps serving it.
+
+        Args:
+            dataset_ids: Datasets to reload; the loaded ones by default. Datasets that are not
+                loaded are skipped, their next request reads the CSV anyway
+            trigger: What asked for the reload, reported in the reload status
+
+        Returns:
+            Outcome per dataset id
+        """
+        with self._reload_lock:
+            self._start_reload(trigger)
+            return self._reload(dataset_ids)
+
+    def reload_in_background(self, dataset_ids: Optional[Iterable[str]] = None, trigger: str = "admin") -> bool:
+        """Run reload() on a background thread. Returns False if a reload is already running."""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self._start_reload(trigger)
+
+        def run():
+            try:
+                self._reload(dataset_ids)
+            finally:
+                self._reload_lock.release()
+
+        Thread(target=run, name="dataset-reload", daemon=True).start()
+        return True
+
+    def reload_status(self) -> dict:
+        return dict(self._reload_status)
+
+    def reset_after_fork(self) -> None:
+        # A fork copies locks in whatever state they are in; a reload running in the parent
+        # would otherwise leave them held forever in the child
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._snapshot_lock = Lock()
+        self._reload_lock = Lock()
+        if self._reload_status.get("running"):
+            self._reload_status = {**self._reload_status, "running": False, "error": "interrupted by fork"}
+
+    def _start_reload(self, trigger: str) -> None:
+        self._reload_status = {"running": True, "trigger": trigger, "started": datetime.now(timezone.utc).isoformat()}
+
+    def _reload(self, dataset_ids: Optional[Iterable[str]]) -> Dict[str, dict]:
+        logger.info("Reloading swim competition datasets…")
+        results = {}
+        with self._write_lock:
+            for dataset_id in list(self._datasets) if dataset_ids is None else dataset_ids:
+                if dataset_id not in self._datasets:
+                    results[dataset_id] = {"status": "skipped", "reason": "not loaded"}
+                    continue
+                try:
+                    dataset = self._build(dataset_id, changed=True)
+                except Exception as e:  # Anything that breaks a load must leave the current version in place
+                    logger.exception(f"Reloading dataset '{dataset_id}' failed, keeping version {self._datasets[dataset_id].version}")
+                    results[dataset_id] = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+                    continue
+                self._store(dataset)
+                results[dataset_id] = {"status": "ok", "version": dataset.version, "load_seconds": dataset.load_seconds}
+        self._reload_status = {
+            **self._reload_status,
+            "running": False,
+            "finished": datetime.now(timezone.utc).isoformat(),
+            "results": results,
+        }
+        logger.info(f"Datasets reloaded: {results}")
+        return results
+
+    def watch(self, interval: float) -> None:
+        """
+        Poll the CSVs of the loaded datasets every interval seconds and reload those that changed.
+        A changed file is loaded once it has stayed the same for one interval, so a copy still
+        in progress is not picked up half-written. Starts at most one watcher per process.
+        """
+        if self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        Thread(target=self._watch, args=(interval,), name="dataset-watcher", daemon=True).start()
+        logger.info(f"Watching {self._data_dir} for changed datasets every {interval:g}s")
+
+    def _watch(self, interval: float) -> None:
+        pending: Dict[str, Tuple[int, int]] = {}
+        # File states that failed to load are not retried until the file changes again
+        failed: Dict[str, Tuple[int, int]] = {}
+        while True:
+            time.sleep(interval)
+            changed = []
+            for dataset_id, (_, recorded, _) in dict(self._versions).items():
+                if dataset_id not in self._datasets:
+                    continue
+                try:
+                    state = self._source_state(dataset_id)
+                except OSError:
+                    # Deleted or being replaced; keep serving what is loaded
+                    continue
+                if state == recorded or state == failed.get(dataset_id):
+                    pending.pop(dataset_id, None)
+                elif pending.get(dataset_id) == state:
+                    changed.append(dataset_id)
+                else:
+                    pending[dataset_id] = state
+            if changed:
+                results = self.reload(changed, trigger="watcher")
+                for dataset_id in changed:
+                    if results.get(dataset_id, {}).get("status") == "failed":
+                        failed[dataset_id] = pending[dataset_id]
+                    else:
+                        failed.pop(dataset_id, None)
+                    del pending[dataset_id]
+
+    def _load_dataset(self, dataset_id: str) -> LoadedDataset:
+        if not self.exists(dataset_id):
+            raise UnknownDataset(f"Unknown dataset '{dataset_id}'")
+        with self._write_lock:
+            # Another request may have loaded it while this one waited
+            dataset = self._datasets.get(dataset_id)
+            if dataset is None:
+                dataset = self._build(dataset_id)
+                self._store(dataset)
+        return dataset
+
+    def _store(self, dataset: LoadedDataset) -> None:
+        with self._lock:
+            self._datasets[dataset.dataset_id] = dataset
+            self._datasets.move_to_end(dataset.dataset_id)
+            # Requests still holding an evicted dataset keep using it until they finish
+            while (
+                self._memory_budget is not None
+                and len(self._datasets) > 1
+                and sum(loaded.memory_bytes for loaded in self._datasets.values()) > self._memory_budget
+            ):
+                evicted_id, _ = self._datasets.popitem(last=False)
+                self._evictions += 1
+                logger.info(f"Evicted dataset '{evicted_id}' to stay within the memory budget")
+
+    def _source_state(self, dataset_id: str) -> Tuple[int, int]:
+        stat = dataset_path(self._data_dir, dataset_id).stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def _next_version(self, dataset_id: str, changed: bool = False) -> Tuple[int, Tuple[int, int], datetime]:
+        # Loading an evicted dataset again keeps its version while the CSV is unchanged,
+        # so responses cached for it stay valid
+        source = self._source_state(dataset_id)
+        version, recorded, last_modified = self._versions.get(dataset_id, (0, None, None))
+        if changed or recorded != source:
+            version += 1
+            last_modified = self._modified_at(dataset_path(self._data_dir, dataset_id), after=last_modified)
+        return version, source, last_modified
+
+    def _build(self, dataset_id: str, changed: bool = False) -> LoadedDataset:
+        """Load a dataset with all its derived structures; changed forces a new data version."""
+        version, source, last_modified = self._next_version(dataset_id, changed)
+        fp = dataset_path(self._data_dir, dataset_id)
+        started = time.perf_counter()
+        df = self._load(fp, source)
+        name_index = NameIndex(df["Name"])
+        search_index = NameSearchIndex(df["Name"].dropna().unique())
+        percentile_engine = PercentileEngine(df)
+        aggregates = AggregateStore(df)
+        self._versions[dataset_id] = (version, source, last_modified)
+        return LoadedDataset(
+            dataset_id=dataset_id,
+            df=df,
+            name_index=name_index,
+            search_index=search_index,
+            percentile_engine=percentile_engine,
+            aggregates=aggregates,
+            version=version,
+            last_modified=last_modified,
+            load_seconds=time.perf_counter() - started,
+            memory_bytes=frame_memory(df),
+            compact=self._compact,
+            source=source,
+        )
+
+    def _load(self, fp: Path, source: Tuple[int, int]) -> pd.DataFrame:
+        snapshot_dir = self._data_dir / SNAPSHOT_DIRNAME
+        if self._use_snapshots:
+            df = self._read_snapshot(fp, snapshot_dir)
+            if df is not None:
+                logger.info(f"Loaded {fp.name} from snapshot")
+                return df
+
+        df = derive_columns(pd.read_csv(fp, usecols=USECOLS, dtype=DTYPES, parse_dates=["RaceDate"]).copy(), self._compact)
+
+        if self._use_snapshots:
+            try:
+                write_snapshot(df, fp, snapshot_dir, self._variant, source_state=source)
+            except OSError as e:
+                logger.warning(f"Could not write snapshot for {fp.name}: {e}")
+            else:
+                mapped = self._read_snapshot(fp, snapshot_dir) if self._mmap else None
+                if mapped is not None:
+                    return mapped
         return df
 
-    def get_data(self, competitive: bool = True) -> pd.DataFrame:
-        # Shallow copy prevents accidental in-place edits from leaking back
-        return (self._competitive if competitive else self._non_competitive).copy(deep=False)
+    def _read_snapshot(self, fp: Path, snapshot_dir: Path) -> Optional[pd.DataFrame]:
+        if self._mmap:
+            return read_snapshot(fp, snapshot_dir, mmap_mode="r", categorical_strings=True, variant=self._variant)
+        return read_snapshot(fp, snapshot_dir, variant=self._variant)
+
+    @staticmethod
+    def _modified_at(fp: Path, after: Optional[datetime] = None) -> datetime:
+        # HTTP dates have second precision, so a new version within the same second as the
+        # previous one is moved a second on; otherwise If-Modified-Since could not tell them apart
+        modified = datetime.fromtimestamp(int(fp.stat().st_mtime), tz=timezone.utc)
+        if after is not None and modified <= after:
+            modified = after + timedelta(seconds=1)
+        return modified
+
+    def ingest(self, results: pd.DataFrame, dataset_id: str = DEFAULT_DATASET) -> LoadedDataset:
+        """
+        Append one race's parsed results to a dataset without reloading it.
+
+        The rows are appended to the CSV and the in-memory frame; the name index is extended,
+        the percentile engine rebuilt for the race's year only and the new rows are added to
+        their aggregate cells. The data version is bumped so
+        cached responses go stale, and the snapshot is rewritten in the background.
+        A dataset id without a CSV yet starts a new dataset with these results.
+
+        Args:
+            results: Output of ResultsFetcher.parse_results for a single race
+            dataset_id: Dataset to append to
+
+        Returns:
+            The updated dataset
+
+        Raises:
+            AlreadyIngested: The race date is already part of the dataset
+            ValueError: The results are missing fields or do not match the dataset's columns
+            UnknownDataset: The dataset id is not valid
+        """
+        fp = dataset_path(self._data_dir, dataset_id)
+        csv_rows = to_csv_rows(results)
+        rows = csv_rows[USECOLS].astype(DTYPES)
+        rows["RaceDate"] = pd.to_datetime(rows["RaceDate"])
+        rows = derive_columns(rows, self._compact)
+
+        with self._write_lock:
+            if not fp.exists():
+                append_csv_rows(csv_rows, fp)
+                updated = self._build(dataset_id, changed=True)
+                self._store(updated)
+                logger.info(f"Created dataset '{dataset_id}' with {len(rows)} results")
+                return updated
+
+            current = self._datasets.get(dataset_id) or self._build(dataset_id)
+            race_dates = rows["RaceDate"].unique()
+            if current.df["RaceDate"].isin(race_dates).any():
+                raise AlreadyIngested(f"Results for {', '.join(str(d.date()) for d in pd.to_datetime(race_dates))} were already ingested")
+
+            append_csv_rows(csv_rows, fp)
+
+            df = append_rows(current.df, rows)
+            updated = replace(
+                current,
+                df=df,
+                name_index=current.name_index.extended(rows["Name"], offset=len(current.df)),
+                search_index=current.search_index.extended(rows["Name"].dropna().unique()),
+                percentile_engine=current.percentile_engine.updated(df, rows["Year"].unique()),
+                aggregates=current.aggregates.updated(rows),
+                version=current.version + 1,
+                last_modified=self._modified_at(fp, after=current.last_modified),
+                memory_bytes=frame_memory(df),
+                source=self._source_state(dataset_id),
+            )
+            self._versions[dataset_id] = (updated.version, updated.source, updated.last_modified)
+            self._store(updated)
+
+        logger.info(f"Ingested {len(rows)} results into {fp.name}")
+        if self._use_snapshots:
+            Thread(target=self._refresh_snapshot, args=(updated,), name="snapshot-refresh", daemon=True).start()
+        return updated
+
+    def _refresh_snapshot(self, dataset: LoadedDataset) -> None:
+        fp = dataset_path(self._data_dir, dataset.dataset_id)
+        # One refresh at a time; one whose ingest has since been followed by another is dropped,
+        # since the later refresh writes the newer data
+        with self._snapshot_lock:
+            if self._versions.get(dataset.dataset_id, (None,))[0] != dataset.version:
+                return
+            try:
+                write_snapshot(dataset.df, fp, self._data_dir / SNAPSHOT_DIRNAME, self._variant, source_state=dataset.source)
+            except OSError as e:
+                logger.warning(f"Could not refresh snapshot for {fp.name}: {e}")
+
+    def get_dataset(self, dataset_id: str = DEFAULT_DATASET) -> LoadedDataset:
+        """
+        The dataset with this id, loading it first if it is not in memory.
+
+        Raises:
+            UnknownDataset: There is no CSV for this id
+        """
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+                return dataset
+        return self._load_dataset(dataset_id)
+
+    def get_current_dataset(self, dataset_id: str, source: Tuple[int, int]) -> LoadedDataset:
+        """
+        The dataset as loaded from its CSV in the given state. A process that missed a reload or
+        an ingestion (e.g. an analysis pool worker) reloads its copy first.
+        """
+        dataset = self.get_dataset(dataset_id)
+        source = tuple(source)
+        # When the CSV has moved on from that state as well, reloading cannot help
+        if dataset.source != source and self._source_state(dataset_id) == source:
+            self.reload([dataset_id], trigger="stale copy")
+            dataset = self.get_dataset(dataset_id)
+        return dataset
+
+    def get_data(self, dataset_id: str = DEFAULT_DATASET) -> pd.DataFrame:
+        return self.get_dataset(dataset_id).data()
+
+    def get_version(self, dataset_id: str = DEFAULT_DATASET) -> int:
+        return self.get_dataset(dataset_id).version
+
+    def get_last_modified(self, dataset_id: str = DEFAULT_DATASET) -> datetime:
+        return self.get_dataset(dataset_id).last_modified
+
+    def get_name_index(self, dataset_id: str = DEFAULT_DATASET) -> NameIndex:
+        return self.get_dataset(dataset_id).name_index
+
+    def get_search_index(self, dataset_id: str = DEFAULT_DATASET) -> NameSearchIndex:
+        return self.get_dataset(dataset_id).search_index
+
+    def get_percentile_engine(self, dataset_id: str = DEFAULT_DATASET) -> PercentileEngine:
+        return self.get_dataset(dataset_id).percentile_engine
+
+    def stats(self) -> dict:
+        """Size and load time of each loaded dataset, keyed by dataset id."""
+        with self._lock:
+            datasets = list(self._datasets.values())
+        return {
+            dataset.dataset_id: {
+                "rows": len(dataset.df),
+                "memory_bytes": dataset.memory_bytes,
+                "load_seconds": dataset.load_seconds,
+                "version": dataset.version,
+            }
+            for dataset in datasets
+        }
+
+    def listing(self) -> dict:
+        """Every dataset in the data directory with its CSV size, plus the stats of the loaded ones."""
+        loaded = self.stats()
+        datasets = []
+        for dataset_id in self.dataset_ids():
+            try:
+                file_bytes = dataset_path(self._data_dir, dataset_id).stat().st_size
+            except OSError:
+                continue
+            datasets.append({"id": dataset_id, "loaded": dataset_id in loaded, "file_bytes": file_bytes, **loaded.get(dataset_id, {})})
+        return {
+            "datasets": datasets,
+            "memory_bytes": sum(stats["memory_bytes"] for stats in loaded.values()),
+            "memory_budget": self._memory_budget,
+            "evictions": self._evictions,
+        }
 
 
 # Global instance
-_service = SwimDataService()
+_service = SwimDataService(
+    os.environ.get("DATA_DIR", "./data"),
+    mmap=os.environ.get("DATA_MMAP", "0") == "1",
+    compact=os.environ.get("DATA_COMPACT", "0") == "1",
+    memory_budget=int(os.environ["DATA_MEMORY_BUDGET"]) if os.environ.get("DATA_MEMORY_BUDGET") else None,
+    preload=[dataset_id for dataset_id in os.environ.get("DATA_PRELOAD", ",".join(PRELOAD_DATASETS)).split(",") if dataset_id],
+)
+os.register_at_fork(after_in_child=_service.reset_after_fork)
+
+
+def load_data(dataset_id: str = DEFAULT_DATASET, force_reload: bool = False) -> pd.DataFrame:
+    if force_reload:
+        _service.reload()
+    return _service.get_data(dataset_id)
+
+
+def load_dataset(dataset_id: str = DEFAULT_DATASET) -> LoadedDataset:
+    return _service.get_dataset(dataset_id)
+
+
+def load_current_dataset(dataset_id: str, source: Tuple[int, int]) -> LoadedDataset:
+    return _service.get_current_dataset(dataset_id, source)
+
+
+def reload_data() -> None:
+    _service.reload()
+
+
+def reload_in_background(dataset_ids: Optional[Iterable[str]] = None) -> bool:
+    return _service.reload_in_background(dataset_ids)
+
+
+def reload_status() -> dict:
+    return _service.reload_status()
+
+
+def start_watching() -> None:
+    """Watch the data directory from this process if DATA_WATCH_INTERVAL (seconds) is set."""
+    interval = float(os.environ.get("DATA_WATCH_INTERVAL", "0"))
+    if interval > 0:
+        _service.watch(interval)
+
+
+def ingest_results(results: pd.DataFrame, dataset_id: str = DEFAULT_DATASET) -> LoadedDataset:
+    return _service.ingest(results, dataset_id)
+
+
+def data_version(dataset_id: str = DEFAULT_DATASET) -> int:
+    return _service.get_version(dataset_id)
+
+
+def data_last_modified(dataset_id: str = DEFAULT_DATASET) -> datetime:
+    return _service.get_last_modified(dataset_id)
+
+
+def load_name_index(dataset_id: str = DEFAULT_DATASET) -> NameIndex:
+    return _service.get_name_index(dataset_id)
+
+
+def load_search_index(dataset_id: str = DEFAULT_DATASET) -> NameSearchIndex:
+    return _service.get_search_index(dataset_id)
+
+
+def dataset_stats() -> dict:
+    return _service.stats()
+
+
+def list_datasets() -> dict:
+    return _service.listing()
 
 
-def load_data(competitive: bool = True, force_reload: bool = False) -> pd.DataFrame:
-    # force_reload kept for API compatibility
-    return _service.get_data(competitive)
+def load_percentile_engine(dataset_id: str = DEFAULT_DATASET) -> PercentileEngine:
+    return _service.get_percentile_engine(dataset_id)
@@ -0,0 +1,333 @@
+from __future__ import annotations
+import logging
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from .columns import minutes
+
+logger = logging.getLogger(__name__)
+
+
+class NameIndex:
+    """
+    Maps each swimmer name to the row positions it occupies in a dataset.
+    """
+
+    _EMPTY = np.empty(0, dtype=np.intp)
+
+    def __init__(self, names: pd.Series):
+        codes, uniques = pd.factorize(names, sort=False)
+        # Group row positions by name code; each name owns a contiguous slice
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        start = int((codes < 0).sum())
+        bounds = start + np.concatenate(([0], np.cumsum(counts)))
+        self._positions = {name: order[bounds[i] : bounds[i + 1]] for i, name in enumerate(uniques)}
+
+    def extended(self, names: pd.Series, offset: int) -> "NameIndex":
+        """Copy of the index with rows appended at positions offset, offset + 1, ..."""
+        appended = NameIndex(names)
+        index = NameIndex.__new__(NameIndex)
+        index._positions = dict(self._positions)
+        for name, positions in appended._positions.items():
+            positions = positions + offset
+            if name in index._positions:
+                positions = np.concatenate([index._positions[name], positions])
+            index._positions[name] = positions
+        return index
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def positions(self, name: str) -> np.ndarray:
+        return self._positions.get(name, self._EMPTY)
+
+
+class PercentileEngine:
+    """
+    Keeps each year's finishing times sorted, overall, per gender and per gender and age group,
+    so percentiles, ranks and the finishers around a time are answered with a binary search
+    instead of a scan of the dataset.
+    """
+
+    _NO_ROWS = np.empty(0, dtype=np.int32)
+    # In the order _build() returns them
+    _TABLES = ("_year_counts", "_group_counts", "_year_times", "_year_rows", "_gender_times", "_group_times", "_group_rows")
+
+    def __init__(self, df: pd.DataFrame):
+        self._assign(self._build(df))
+
+    def _assign(self, tables) -> None:
+        for name, table in zip(self._TABLES, tables):
+            setattr(self, name, table)
+
+    @staticmethod
+    def _build(df: pd.DataFrame, positions: Optional[np.ndarray] = None):
+        frame = pd.DataFrame(
+            {
+                "Year": df["Year"],
+                "Gender": df["Gender"],
+                "AgeGroup": df["AgeGroup"],
+                "Time": minutes(df).to_numpy(dtype="float64", na_value=np.nan),
+                # Position of each row in the full dataset, for looking up who finished where
+                "Row": (np.arange(len(df)) if positions is None else positions).astype(np.int32),
+            }
+        ).dropna(subset=["Year"])
+
+        # Row counts include swimmers without a recorded time, matching len() on the filtered frame
+        year_counts = {int(y): int(n) for y, n in frame.groupby("Year").size().items()}
+        group_counts = frame.groupby(["Year", "Gender", "AgeGroup"], observed=True).size()
+        group_counts = {(int(y), g, str(a)): int(n) for (y, g, a), n in group_counts.items() if n}
+
+        # Sorted once; every group keeps that order, so each one's times come out sorted
+        timed = frame.dropna(subset=["Time"]).sort_values(["Time", "Row"], kind="stable")
+        year_times, year_rows = {}, {}
+        for y, group in timed.groupby("Year", sort=False):
+            year_times[int(y)] = group["Time"].to_numpy()
+            year_rows[int(y)] = group["Row"].to_numpy()
+        gender_times = {
+            (int(y), g): group["Time"].to_numpy() for (y, g), group in timed.groupby(["Year", "Gender"], observed=True, sort=False)
+        }
+        group_times, group_rows = {}, {}
+        for (y, g, a), group in timed.groupby(["Year", "Gender", "AgeGroup"], observed=True, sort=False):
+            group_times[(int(y), g, str(a))] = group["Time"].to_numpy()
+            group_rows[(int(y), g, str(a))] = group["Row"].to_numpy()
+        return year_counts, group_counts, year_times, year_rows, gender_times, group_times, group_rows
+
+    def updated(self, df: pd.DataFrame, years) -> "PercentileEngine":
+        """Copy of the engine with the given years rebuilt from df; other years are reused as-is."""
+        years = {int(y) for y in years}
+        in_years = df["Year"].isin(years).to_numpy()
+        rebuilt = self._build(df[in_years], np.flatnonzero(in_years))
+        tables = []
+        for name, fresh in zip(self._TABLES, rebuilt):
+            current = getattr(self, name)
+            table = {key: value for key, value in current.items() if (key if isinstance(key, int) else key[0]) not in years}
+            table.update(fresh)
+            tables.append(table)
+        engine = PercentileEngine.__new__(PercentileEngine)
+        engine._assign(tables)
+        return engine
+
+    def _times(self, year, gender=None) -> np.ndarray:
+        key = int(year) if gender is None else (int(year), gender)
+        table = self._year_times if gender is None else self._gender_times
+        return table.get(key, np.empty(0))
+
+    def _field(self, year, gender=None, age_group=None) -> Tuple[np.ndarray, np.ndarray]:
+        # Sorted times of a year's (or a year's gender and age group's) finishers and the row of each
+        if gender is None:
+            return self._year_times.get(int(year), np.empty(0)), self._year_rows.get(int(year), self._NO_ROWS)
+        key = (int(year), gender, str(age_group))
+        return self._group_times.get(key, np.empty(0)), self._group_rows.get(key, self._NO_ROWS)
+
+    def percentiles(self, years, times, gender=None) -> np.ndarray:
+        """
+        Percentile of each (year, time) pair among that year's finishers.
+
+        For swimming, lower time is better, so the percentile is inverted:
+        being the fastest puts you in the 100th percentile.
+
+        Args:
+            years: Year of each pair
+            times: Finishing time (min) of each pair
+            gender: Restrict the field to this gender
+
+        Returns:
+            Array of percentiles, NaN where the field is empty
+        """
+        years = np.asarray(years)
+        times = np.asarray(times, dtype="float64")
+        result = np.full(len(times), np.nan)
+        for year in np.unique(years):
+            field = self._times(year, gender)
+            if len(field) == 0:
+                continue
+            mask = (years == year) & ~np.isnan(times)
+            slower_or_equal = len(field) - np.searchsorted(field, times[mask], side="left")
+            result[mask] = slower_or_equal / len(field) * 100
+        return result
+
+    def percentile(self, year, time, gender=None) -> float:
+        return float(self.percentiles([year], [time], gender)[0])
+
+    def rank(self, year, time) -> int:
+        """Overall position in the year: one plus the number of strictly faster finishers."""
+        time = np.nan if pd.isna(time) else float(time)
+        return int(np.searchsorted(self._times(year), time, side="left")) + 1
+
+    def ranks(self, years, times) -> np.ndarray:
+        """Overall position of each (year, time) pair, as rank() does for one."""
+        years = np.asarray(years)
+        times = np.asarray(times, dtype="float64")
+        result = np.ones(len(times), dtype=np.int64)
+        for year in np.unique(years):
+            mask = years == year
+            result[mask] += np.searchsorted(self._times(year), times[mask], side="left")
+        return result
+
+    def places(self, year, times, gender=None, age_group=None) -> np.ndarray:
+        """Position of each time in the year, or in the year's gender and age group, as rank() counts it."""
+        field, _ = self._field(year, gender, age_group)
+        return np.searchsorted(field, np.asarray(times, dtype="float64"), side="left") + 1
+
+    def rivals(self, year, time, k, gender=None, age_group=None, exclude=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The finishers closest to a time: a binary search into the field, then a slice either side.
+
+        Args:
+            year: Year of the field
+            time: Finishing time (min) to look around
+            k: Number of finishers to return on each side
+            gender: Restrict the field to this gender and age_group
+            age_group: Age group of the field when gender is given
+            exclude: Row positions to leave out, e.g. the swimmer's own results
+
+        Returns:
+            Row positions of up to k finishers ahead of time and up to k behind it (ties count
+            as behind), each fastest first
+        """
+        field, rows = self._field(year, gender, age_group)
+        start = int(np.searchsorted(field, float(time), side="left"))
+        skip = self._NO_ROWS if exclude is None else np.asarray(exclude)
+        # Widen each slice by the excluded rows so k remain after dropping them
+        ahead = rows[max(0, start - k - len(skip)) : start]
+        behind = rows[start : start + k + len(skip)]
+        ahead = ahead[~np.isin(ahead, skip)]
+        return ahead[max(len(ahead) - k, 0) :], behind[~np.isin(behind, skip)][:k]
+
+    def participants(self, year, gender=None, age_group=None) -> int:
+        if gender is None:
+            return self._year_counts.get(int(year), 0)
+        return self._group_counts.get((int(year), gender, str(age_group)), 0)
+
+
+class NameSearchIndex:
+    """
+    Prefix and fuzzy lookup over the distinct swimmer names of a dataset.
+
+    Prefixes are matched against sorted arrays of keys (each full name, and each name from its
+    second word on, so "zem" finds "karen zemlin") with a binary search, which gives the same ordered
+    walk as a trie at a fraction of the memory. Fuzzy matches come from a trigram index:
+    posting lists of name ids per trigram, scored with the Dice coefficient.
+    """
+
+    MIN_FUZZY_SCORE = 0.3
+
+    def __init__(self, names: Iterable[str]):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._full_keys: List[Tuple[str, int]] = []
+        self._word_keys: List[Tuple[str, int]] = []
+        self._postings: Dict[str, np.ndarray] = {}
+        self._trigram_counts = np.zeros(0, dtype=np.int32)
+        self._add(names)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _trigrams(name: str) -> Set[str]:
+        padded = f"  {name} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def _add(self, names: Iterable[str]) -> None:
+        new_names = [name for name in dict.fromkeys(n for n in names if isinstance(n, str)) if name not in self._ids]
+        if not new_names:
+            return
+
+        full_keys, word_keys, postings, counts = [], [], {}, []
+        for i, name in enumerate(new_names, len(self._names)):
+            self._ids[name] = i
+            key = self.normalize(name)
+            words = key.split(" ")
+            full_keys.append((key, i))
+            word_keys.extend((" ".join(words[j:]), i) for j in range(1, len(words)))
+            trigrams = self._trigrams(key)
+            counts.append(len(trigrams))
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(i)
+
+        self._names.extend(new_names)
+        self._full_keys = sorted(self._full_keys + full_keys)
+        self._word_keys = sorted(self._word_keys + word_keys)
+        self._trigram_counts = np.concatenate([self._trigram_counts, np.asarray(counts, dtype=np.int32)])
+        for trigram, ids in postings.items():
+            ids = np.asarray(ids, dtype=np.int32)
+            existing = self._postings.get(trigram)
+            self._postings[trigram] = ids if existing is None else np.concatenate([existing, ids])
+        logger.debug(f"Indexed {len(new_names)} names for search")
+
+    def extended(self, names: Iterable[str]) -> "NameSearchIndex":
+        """Copy of the index with any names it does not know yet added."""
+        index = NameSearchIndex.__new__(NameSearchIndex)
+        index._names = list(self._names)
+        index._ids = dict(self._ids)
+        index._full_keys = self._full_keys
+        index._word_keys = self._word_keys
+        index._postings = dict(self._postings)
+        index._trigram_counts = self._trigram_counts
+        index._add(names)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _scan(keys: List[Tuple[str, int]], query: str, limit: int) -> List[int]:
+        ids = []
+        i = bisect_left(keys, (query,))
+        while i < len(keys) and len(ids) < limit and keys[i][0].startswith(query):
+            ids.append(keys[i][1])
+            i += 1
+        return ids
+
+    def prefix(self, query: str, limit: int = 10) -> List[str]:
+        """Names starting with the query, then names with a later word starting with it."""
+        query = self.normalize(query)
+        if not query:
+            return []
+        ids = self._scan(self._full_keys, query, limit)
+        if len(ids) < limit:
+            ids += self._scan(self._word_keys, query, limit + len(ids))
+        return [self._names[i] for i in dict.fromkeys(ids)][:limit]
+
+    def fuzzy(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Names sharing the most trigrams with the query, best Dice score first."""
+        query = self.normalize(query)
+        if not query:
+            return []
+        trigrams = self._trigrams(query)
+        lists = [self._postings[t] for t in trigrams if t in self._postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._names))
+        scores = 2 * shared / (len(trigrams) + self._trigram_counts)
+        candidates = np.flatnonzero(scores >= self.MIN_FUZZY_SCORE)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        ranked = sorted(candidates, key=lambda i: (-scores[i], self._names[i]))
+        return [(self._names[i], float(scores[i])) for i in ranked]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float, str]]:
+        """
+        Ranked (name, score, match) candidates: prefix matches first, then fuzzy matches.
+
+        Args:
+            query: Partial or misspelled name
+            limit: Maximum number of candidates
+
+        Returns:
+            List of (name, score, "prefix" | "fuzzy")
+        """
+        results = [(name, 1.0, "prefix") for name in self.prefix(query, limit)]
+        if len(results) < limit:
+            seen = {name for name, _, _ in results}
+            fuzzy = [(name, score, "fuzzy") for name, score in self.fuzzy(query, limit) if name not in seen]
+            results.extend(fuzzy[: limit - len(results)])
+        return results
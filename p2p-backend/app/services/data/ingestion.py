@@ -0,0 +1,86 @@
+from __future__ import annotations
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Column order of the result CSVs
+CSV_COLUMNS = [
+    "Place",
+    "Name",
+    "Gender",
+    "Pace (min/mi)",
+    "Time (ms)",
+    "Age",
+    "Bib",
+    "Country",
+    "Locality",
+    "Region",
+    "OverallRank",
+    "GenderRank",
+    "RaceDate",
+]
+
+# ResultsFetcher.parse_results field -> CSV column
+FIELD_MAP = {
+    "place": "Place",
+    "name": "Name",
+    "gender": "Gender",
+    "pace": "Pace (min/mi)",
+    "time": "Time (ms)",
+    "age": "Age",
+    "bib": "Bib",
+    "country": "Country",
+    "locality": "Locality",
+    "region": "Region",
+    "overall_rank": "OverallRank",
+    "gender_rank": "GenderRank",
+    "race_date": "RaceDate",
+}
+
+INTEGER_COLUMNS = ["Place", "Time (ms)", "Age", "OverallRank", "GenderRank"]
+
+
+def to_csv_rows(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map parsed results onto the result CSV schema.
+
+    Args:
+        results: Output of ResultsFetcher.parse_results
+
+    Returns:
+        DataFrame with CSV_COLUMNS, integer columns as nullable Int64
+    """
+    missing = set(FIELD_MAP) - set(results.columns)
+    if missing:
+        raise ValueError(f"Parsed results are missing fields: {', '.join(sorted(missing))}")
+
+    rows = results.rename(columns=FIELD_MAP)[CSV_COLUMNS].copy()
+    # A missing value turns the parsed integer columns into floats; keep "33", not "33.0", in the CSV
+    for column in INTEGER_COLUMNS:
+        rows[column] = rows[column].astype("Int64")
+    rows["RaceDate"] = pd.to_datetime(rows["RaceDate"]).dt.normalize()
+    return rows
+
+
+def append_csv_rows(rows: pd.DataFrame, path: Path) -> None:
+    """Append rows to a result CSV, writing the header only when the file is new."""
+    new_file = not path.exists() or path.stat().st_size == 0
+    rows.to_csv(path, mode="a", header=new_file, index=False, columns=CSV_COLUMNS, date_format="%Y-%m-%d")
+
+
+if __name__ == "__main__":
+    # python -m app.services.data.ingestion <event_id> <event_course_id> <YYYY-MM-DD> [dataset id, default competitive]
+    # Appends to the CSV only; running servers pick the rows up on their next reload.
+    from .data_gatherer import ResultsFetcher
+    from .data_loader import DEFAULT_DATASET, dataset_path
+
+    logging.basicConfig(level=logging.INFO)
+    event_id, event_course_id, race_date = sys.argv[1:4]
+    dataset_id = sys.argv[4] if len(sys.argv) > 4 else DEFAULT_DATASET
+    parsed = ResultsFetcher().fetch_and_parse(event_id, event_course_id, datetime.strptime(race_date, "%Y-%m-%d"))
+    append_csv_rows(to_csv_rows(parsed), dataset_path(Path("./data"), dataset_id))
+    logger.info(f"Appended {len(parsed)} results for {race_date}")
@@ -0,0 +1,215 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_DIRNAME = ".snapshots"
+
+
+def _fingerprint(source: Path, with_hash: bool = True) -> Dict[str, Any]:
+    stat = source.stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(source, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def _encode_column(series: pd.Series) -> Dict[str, Any]:
+    """Split a column into plain NumPy arrays plus the metadata needed to rebuild its dtype."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {
+            "kind": "categorical",
+            "categories": dtype.categories.tolist(),
+            "ordered": bool(dtype.ordered),
+            "arrays": {"codes": series.cat.codes.to_numpy()},
+        }
+    if isinstance(dtype, pd.StringDtype):
+        codes, uniques = pd.factorize(series)
+        return {"kind": "string", "categories": uniques.tolist(), "arrays": {"codes": codes.astype(np.int32)}}
+    if pd.api.types.is_extension_array_dtype(dtype) and dtype.kind in "iuf":
+        return {
+            "kind": "masked",
+            "dtype": str(dtype),
+            "arrays": {
+                "values": series.to_numpy(dtype=dtype.numpy_dtype, na_value=0),
+                "mask": series.isna().to_numpy(),
+            },
+        }
+    return {"kind": "numpy", "arrays": {"values": series.to_numpy()}}
+
+
+def _decode_column(spec: Dict[str, Any], arrays: Dict[str, np.ndarray], categorical_strings: bool = False):
+    kind = spec["kind"]
+    if kind == "categorical" or (kind == "string" and categorical_strings):
+        dtype = pd.CategoricalDtype(spec["categories"], ordered=spec.get("ordered", False))
+        return pd.Categorical.from_codes(arrays["codes"], dtype=dtype)
+    if kind == "string":
+        uniques = pd.array(spec["categories"], dtype="string")
+        return uniques.take(arrays["codes"], allow_fill=True)
+    if kind == "masked":
+        array_type = pd.arrays.FloatingArray if spec["dtype"].startswith("Float") else pd.arrays.IntegerArray
+        return array_type(arrays["values"], arrays["mask"])
+    return arrays["values"]
+
+
+def _snapshot_key(source: Path, variant: str) -> str:
+    return f"{source.stem}.{variant}" if variant else source.stem
+
+
+def write_snapshot(
+    df: pd.DataFrame,
+    source: Path,
+    snapshot_dir: Path,
+    variant: str = "",
+    source_state: Optional[Tuple[int, int]] = None,
+) -> Optional[Path]:
+    """
+    Write a columnar snapshot of a loaded dataset next to its source CSV.
+
+    Every column is stored as one or two .npy files in a fresh directory; the manifest that
+    points at it is replaced last, so readers never see a half-written snapshot.
+
+    Args:
+        df: Dataset with its derived columns already computed
+        source: CSV the dataset was loaded from
+        snapshot_dir: Directory holding the snapshots
+        variant: Storage layout of df (e.g. "compact"); each layout has its own snapshot
+        source_state: (size, mtime_ns) of the CSV when df was taken from it; when the CSV no
+            longer matches, df is out of date and no snapshot is written
+
+    Returns:
+        Path of the manifest, or None when source_state no longer matches the CSV
+    """
+    key = _snapshot_key(source, variant)
+    fingerprint = _fingerprint(source)
+    if source_state is not None:
+        # Checked on both sides of hashing, so the hash is of the CSV df was taken from
+        states = ((fingerprint["size"], fingerprint["mtime_ns"]), _source_state(source))
+        if any(state != tuple(source_state) for state in states):
+            logger.info(f"Not writing a snapshot of {source.name}: it changed since the data was read")
+            return None
+    target = snapshot_dir / f"{key}-{fingerprint['sha256'][:16]}"
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    # A directory of its own per write, so concurrent writers never share one
+    staging = Path(tempfile.mkdtemp(prefix=f"{target.name}.tmp-", dir=snapshot_dir))
+    staging.chmod(0o755)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        spec = _encode_column(df[name])
+        arrays = spec.pop("arrays")
+        spec["name"] = name
+        spec["files"] = {}
+        for part, array in arrays.items():
+            filename = f"{i:02d}-{part}.npy"
+            np.save(staging / filename, np.ascontiguousarray(array), allow_pickle=False)
+            spec["files"][part] = filename
+        columns.append(spec)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    manifest = snapshot_dir / f"{key}.json"
+    meta = {"format": SNAPSHOT_FORMAT, "directory": target.name, "rows": len(df), "source": fingerprint, "columns": columns}
+    _write_manifest(manifest, meta)
+
+    # Drop snapshots of earlier versions of this CSV
+    for stale in snapshot_dir.glob(f"{key}-*"):
+        if stale.is_dir() and stale != target and ".tmp-" not in stale.name:
+            shutil.rmtree(stale, ignore_errors=True)
+    return manifest
+
+
+def _source_state(source: Path) -> Tuple[int, int]:
+    stat = source.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _write_manifest(manifest: Path, meta: Dict[str, Any]) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=f"{manifest.name}.tmp-", dir=manifest.parent)
+    with os.fdopen(fd, "w") as fh:
+        fh.write(json.dumps(meta))
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, manifest)
+
+
+def _is_fresh(meta: Dict[str, Any], source: Path, manifest: Path) -> bool:
+    recorded = meta["source"]
+    current = _fingerprint(source, with_hash=False)
+    if current["size"] != recorded["size"]:
+        return False
+    if current["mtime_ns"] == recorded["mtime_ns"]:
+        return True
+
+    # Touched but possibly unchanged (e.g. a fresh checkout): fall back to the content hash
+    if _fingerprint(source)["sha256"] != recorded["sha256"]:
+        return False
+    meta["source"]["mtime_ns"] = current["mtime_ns"]
+    try:
+        _write_manifest(manifest, meta)
+    except OSError:
+        pass
+    return True
+
+
+def read_snapshot(
+    source: Path,
+    snapshot_dir: Path,
+    mmap_mode: Optional[str] = None,
+    categorical_strings: bool = False,
+    variant: str = "",
+) -> Optional[pd.DataFrame]:
+    """
+    Read the snapshot for a CSV if one exists and still matches the CSV.
+
+    Args:
+        source: CSV the snapshot was written from
+        snapshot_dir: Directory holding the snapshots
+        mmap_mode: Passed to np.load; "r" maps the column files read-only instead of reading them
+        categorical_strings: Keep string columns dictionary-encoded so they stay backed by the mapping
+        variant: Storage layout the snapshot was written in
+
+    Returns:
+        The dataset, or None when the snapshot is missing or stale
+    """
+    manifest = snapshot_dir / f"{_snapshot_key(source, variant)}.json"
+    try:
+        meta = json.loads(manifest.read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != SNAPSHOT_FORMAT or not _is_fresh(meta, source, manifest):
+        return None
+
+    directory = snapshot_dir / meta["directory"]
+    try:
+        data = {}
+        for spec in meta["columns"]:
+            arrays = {part: np.load(directory / filename, mmap_mode=mmap_mode) for part, filename in spec["files"].items()}
+            data[spec["name"]] = _decode_column(spec, arrays, categorical_strings)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable snapshot {manifest}: {e}")
+        return None
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    # Build snapshots ahead of time, e.g. while building the container image
+    from .data_loader import SwimDataService
+
+    SwimDataService(sys.argv[1] if len(sys.argv) > 1 else "./data", compact=os.environ.get("DATA_COMPACT", "0") == "1")
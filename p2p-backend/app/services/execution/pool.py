@@ -0,0 +1,125 @@
+from __future__ import annotations
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Extra time the caller waits past the task timeout for the worker to report it
+TIMEOUT_GRACE = 1.0
+
+
+class PoolSaturated(RuntimeError):
+    pass
+
+
+class TaskTimeout(RuntimeError):
+    pass
+
+
+def _call_with_timeout(timeout: float, func: Callable, *args):
+    # Runs in the worker: SIGALRM interrupts the task at the next bytecode boundary, so a
+    # runaway task frees its worker instead of holding it until it finishes
+    def expire(signum, frame):
+        raise TaskTimeout(f"Task exceeded {timeout:g}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _ready(_) -> int:
+    return os.getpid()
+
+
+class ProcessPool:
+    """
+    Runs tasks in worker processes forked from this one, so they start out with everything
+    it has loaded (the datasets) and only task arguments and results cross the process boundary.
+
+    At most workers + queue_size tasks are accepted at a time; run() rejects any beyond that
+    with PoolSaturated right away instead of letting them wait in an unbounded queue.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = BoundedSemaphore(workers + queue_size)
+        self._in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool created before a fork (e.g. in the gunicorn master) belongs to the parent
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+                self._slots = BoundedSemaphore(self.workers + self.queue_size)
+                self._in_flight = 0
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Fork the workers now rather than on the first task, e.g. before threads are started."""
+        executor = self._get_executor()
+        pids = set(executor.map(_ready, range(self.workers)))
+        logger.info(f"Started analysis pool workers {sorted(pids)}")
+
+    def _release(self, slots: BoundedSemaphore) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        slots.release()
+
+    def run(self, func: Callable, *args):
+        """
+        Run func(*args) in a worker and return its result.
+
+        Raises:
+            PoolSaturated: Every worker is busy and the queue is full
+            TaskTimeout: The task took longer than the pool's timeout
+        """
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PoolSaturated(f"All {self.workers} workers are busy and {self.queue_size} tasks are queued")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = executor.submit(_call_with_timeout, self.timeout, func, *args)
+        except BrokenProcessPool:
+            self._release(slots)
+            self._discard(executor)
+            raise
+        # The slot is freed when the task ends, not when the caller gives up on it
+        future.add_done_callback(lambda _: self._release(slots))
+
+        try:
+            return future.result(timeout=self.timeout + TIMEOUT_GRACE)
+        except FutureTimeout:
+            future.cancel()
+            raise TaskTimeout(f"Task exceeded {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next task gets a fresh pool
+            logger.error("Analysis pool broke, restarting it")
+            self._discard(executor)
+            raise
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queue_size": self.queue_size, "in_flight": self._in_flight, "timeout": self.timeout}
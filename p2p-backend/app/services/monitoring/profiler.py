@@ -0,0 +1,166 @@
+from __future__ import annotations
+import itertools
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+# Frames are named relative to these: app/..., pandas/..., json/...
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_JSON_FUNCTIONS = {"jsonify", "dumps", "json_response"}
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    for root in (_ROOT, _STDLIB):
+        if filename.startswith(root + os.sep):
+            return os.path.relpath(filename, root)
+    return os.path.basename(filename)
+
+
+@lru_cache(maxsize=4096)
+def _category(code) -> Optional[str]:
+    # The part of a request a frame belongs to; serialization is checked first since
+    # the payload encoder lives next to the visualizers
+    path = _short_path(code.co_filename)
+    if code.co_name in _JSON_FUNCTIONS or path.startswith("flask/json") or path.startswith("json" + os.sep):
+        return "jsonify"
+    if path.endswith("user_analysis.py"):
+        return "UserAnalysis"
+    if path.endswith("general_analysis.py"):
+        return "GeneralAnalysis"
+    if "visualization" + os.sep in path:
+        return "visualizer"
+    return None
+
+
+def collapse(stacks: Counter) -> str:
+    """Stacks in the collapsed format read by flamegraph.pl and speedscope: "root;...;leaf count" per line."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    route: str
+    dataset: str
+    started: datetime
+    interval: float
+    status: int = 0
+    duration: float = 0.0
+    stacks: Counter = field(default_factory=Counter)
+    categories: Counter = field(default_factory=Counter)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> dict:
+        # Each category's share of the samples, scaled to the request's wall time
+        samples = self.samples
+        breakdown = {category: round(self.duration * 1000 * count / samples, 3) for category, count in self.categories.most_common()}
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "dataset": self.dataset,
+            "status": self.status,
+            "started": self.started.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "breakdown_ms": breakdown,
+        }
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread: a background thread reads the thread's current stack
+    every interval seconds. Nothing is traced in between, so the profiled code runs at full speed
+    apart from the GIL hand-offs to the sampler.
+    """
+
+    def __init__(self, profile: Profile, thread_id: int):
+        self.profile = profile
+        self._thread_id = thread_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{profile.id}", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self, status: int) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        self.profile.status = status
+        return self.profile
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.profile.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                return
+            self._sample(frame)
+
+    def _sample(self, frame) -> None:
+        names = []
+        category = None
+        while frame is not None:
+            code = frame.f_code
+            if category is None:
+                category = _category(code)
+            names.append(f"{_short_path(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        self.profile.stacks[";".join(reversed(names))] += 1
+        self.profile.categories[category or "other"] += 1
+
+
+class ProfileBuffer:
+    """The last size profiles of this process, oldest dropped first."""
+
+    def __init__(self, size: int):
+        self._profiles: deque = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        # Unique across the worker processes, which each keep their own buffer
+        return f"{os.getpid()}-{next(self._ids)}"
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            profiles = list(self._profiles)
+        return [profile.summary() for profile in reversed(profiles)]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+    def merged(self, route: Optional[str] = None) -> Counter:
+        """Stacks of every buffered profile, or of one route's, added together."""
+        stacks: Counter = Counter()
+        with self._lock:
+            for profile in self._profiles:
+                if route is None or profile.route == route:
+                    stacks.update(profile.stacks)
+        return stacks
@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context
+
+
+def start_request_timing() -> None:
+    g.stage_stack = []
+    g.stage_times = {}
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a stage of the current request. Stages may nest; each one is credited only with
+    the time not spent in the stages inside it, so the stage times of a request add up.
+    Outside a request (CLI tools, background threads) this does nothing.
+    """
+    if not has_request_context() or "stage_stack" not in g:
+        yield
+        return
+
+    frame = [time.perf_counter(), 0.0]
+    g.stage_stack.append(frame)
+    try:
+        yield
+    finally:
+        g.stage_stack.pop()
+        elapsed = time.perf_counter() - frame[0]
+        g.stage_times[name] = g.stage_times.get(name, 0.0) + elapsed - frame[1]
+        if g.stage_stack:
+            g.stage_stack[-1][1] += elapsed
+
+
+def timed(name: str):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrumented(name: str):
+    """Class decorator timing every static method of the class (analysis, visualizers) as one stage."""
+
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if isinstance(value, staticmethod):
+                setattr(cls, attr, staticmethod(timed(name)(value.__func__)))
+        return cls
+
+    return decorator
+
+
+def stage_times() -> dict:
+    return dict(g.get("stage_times", {}))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    if has_request_context():
+        g.setdefault("cache_lookups", []).append((cache, "hit" if hit else "miss"))
@@ -0,0 +1,71 @@
+import json
+from functools import lru_cache
+from plotly import graph_objs as go
+import plotly.io as pio
+
+AXIS_TITLE_FONT = dict(size=14)
+STYLE = dict(
+    legend=dict(orientation="h", x=0.5, xanchor="center", y=-0.2),
+    hovermode="closest",
+    margin=dict(l=50, r=50, t=50, b=50),
+    font=dict(family="Arial, sans-serif", size=12, color="#7f7f7f"),
+    paper_bgcolor="rgba(0,0,0,0)",
+    plot_bgcolor="rgba(0,0,0,0)",
+    template="plotly_white",
+    dragmode="pan",
+    modebar=dict(
+        orientation="v",
+        bgcolor="rgba(0,0,0,0)",
+        color="#7f7f7f",
+        activecolor="#FF5733",
+    ),
+)
+
+
+class Layout:
+    @staticmethod
+    def customize_layout(title, xaxis_title, yaxis_title, barmode=None):
+        layout = go.Layout(
+            title=title,
+            xaxis=dict(title=xaxis_title, title_font=AXIS_TITLE_FONT),
+            yaxis=dict(title=yaxis_title, title_font=AXIS_TITLE_FONT),
+            barmode=barmode,
+            **STYLE,
+        )
+        return layout
+
+    @staticmethod
+    def chart_layout(title, xaxis_title, yaxis_title, barmode=None):
+        # The per-chart part of a layout; clients merge it over style_document()
+        layout = {"title": {"text": title}, "xaxis": {"title": {"text": xaxis_title}}, "yaxis": {"title": {"text": yaxis_title}}}
+        if barmode:
+            layout["barmode"] = barmode
+        return layout
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def style_document():
+        # Styling shared by every chart, with the template expanded; it never changes at runtime
+        layout = go.Layout(xaxis=dict(title_font=AXIS_TITLE_FONT), yaxis=dict(title_font=AXIS_TITLE_FONT), **STYLE)
+        return layout.to_plotly_json()
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def serialized(title, xaxis_title, yaxis_title, barmode=None, trace_types=()):
+        """
+        Layout JSON for a chart, validated by Plotly once and then reused for every response.
+
+        The template is cut down to the trace types the chart draws; the styling for the
+        other two dozen types Plotly ships with would never be used by the client.
+        """
+        layout = Layout.customize_layout(title, xaxis_title, yaxis_title, barmode).to_plotly_json()
+        layout.pop("template", None)
+        body = json.dumps(layout, separators=(",", ":"))
+        return '{"template":' + Layout._template_json(trace_types) + "," + body[1:]
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _template_json(trace_types):
+        template = pio.templates[STYLE["template"]].to_plotly_json()
+        data = {trace_type: styles for trace_type, styles in template.get("data", {}).items() if trace_type in trace_types}
+        return json.dumps({"data": data, "layout": template.get("layout", {})}, separators=(",", ":"))
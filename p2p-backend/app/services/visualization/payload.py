@@ -0,0 +1,94 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request
+from app.services.monitoring.stages import stage, timed
+from app.services.visualization.layout import Layout
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is used without it
+    orjson = None
+
+OUTPUT_FORMATS = ("graph", "data")
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def requested_format():
+    output_format = request.args.get("format", "graph")
+    if output_format not in OUTPUT_FORMATS:
+        raise UnsupportedFormat(f"format must be one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+def column(values):
+    """One JSON-ready column: numbers as a NumPy array (missing values become null), anything else as a list."""
+    if not isinstance(values, (pd.Series, pd.Index)):
+        values = pd.Series(values)
+    dtype = values.dtype
+    if pd.api.types.is_integer_dtype(dtype) and not values.hasnans:
+        return np.ascontiguousarray(values.to_numpy(dtype="int64"))
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return np.ascontiguousarray(values.to_numpy(dtype="float64", na_value=np.nan))
+    return [None if value is None or value is pd.NA or value != value else value for value in values.astype(object).tolist()]
+
+
+def _plain(value):
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        return _plain(value.item())
+    return value
+
+
+@timed("serialize")
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_plain, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_plain(payload), separators=(",", ":")).encode()
+
+
+def json_response(payload, status=200) -> Response:
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+
+def render_chart(
+    traces, title, xaxis_title, yaxis_title, barmode=None, table=None, table_orient="records", output_format=None, **extra
+):
+    """
+    Respond with a chart in the requested format.
+
+    format=graph (default) sends a serialized Plotly figure plus the table as built by to_dict.
+    format=data skips Plotly entirely: traces and table are sent as columns, and the layout
+    only carries the per-chart titles; the shared styling is served once by /api/layout.
+    """
+    if (output_format or requested_format()) == "data":
+        payload = {
+            "traces": traces,
+            "layout": Layout.chart_layout(title, xaxis_title, yaxis_title, barmode),
+        }
+        if table is not None:
+            payload["table"] = {str(name): column(values) for name, values in table.items()}
+        payload.update(extra)
+        return json_response(payload)
+
+    # Traces are assembled as-is around the cached layout; they are not run through Plotly's validators
+    trace_types = tuple(sorted({trace.get("type", "scatter") for trace in traces}))
+    layout = Layout.serialized(title, xaxis_title, yaxis_title, barmode, trace_types)
+    graph = '{"data":' + dumps(traces).decode() + ',"layout":' + layout + "}"
+    payload = {"graph": graph}
+    if table is not None:
+        payload["table"] = table.to_dict(orient=table_orient) if isinstance(table, pd.DataFrame) else table
+    payload.update(extra)
+    with stage("serialize"):
+        return jsonify(payload)
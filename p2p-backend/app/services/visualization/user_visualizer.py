@@ -1,25 +1,29 @@
-from plotly import graph_objs as go
-from flask import jsonify
-from app.services.visualization.general_visualizer import Layout
+import math
+from itertools import groupby
+import numpy as np
+import pandas as pd
+from app.services.visualization.payload import column, json_response, render_chart
+from app.services.monitoring.stages import instrumented
 
 
+@instrumented("render")
 class UserVisualizer:
     @staticmethod
     def plot_user_time_by_year(person_data):
         if person_data is None:
             return None
         name = person_data["Name"].iloc[0]
-        trace = go.Scatter(
-            x=person_data["Year"].tolist(),
-            y=person_data["Time (min)"].tolist(),
+        trace = dict(
+            type="scatter",
+            x=column(person_data["Year"]),
+            y=column(person_data["Time (min)"]),
             mode="lines+markers",
             name=f"{name}'s Time",
             line=dict(color="navy"),
         )
-        layout = Layout.customize_layout(f"{name}'s Time Over the Years", "Year", "Time (min)")
-        fig = go.Figure(data=[trace], layout=layout)
-        tabular_data = person_data[["Year", "Time (min)"]].to_dict(orient="records")
-        return jsonify({"graph": fig.to_json(), "table": tabular_data})
+        return render_chart(
+            [trace], f"{name}'s Time Over the Years", "Year", "Time (min)", table=person_data[["Year", "Time (min)"]]
+        )
 
     @staticmethod
     def plot_user_time_percentile_by_year(data):
@@ -29,29 +33,33 @@ class UserVisualizer:
         name = person_data["Name"].iloc[0]
         years, percentiles_all_values = zip(*percentiles_all)
         _, percentiles_gender_values = zip(*percentiles_gender)
+        table = pd.DataFrame(
+            {
+                "Year": [int(y) for y in years],
+                "Overall Percentile": [float(p) for p in percentiles_all_values],
+                f"{person_gender} Percentile": [float(p) for p in percentiles_gender_values],
+            }
+        )
 
-        trace1 = go.Scatter(
-            x=years,
-            y=percentiles_all_values,
+        trace1 = dict(
+            type="scatter",
+            x=column(table["Year"]),
+            y=column(table["Overall Percentile"]),
             mode="lines+markers",
             name="Overall Percentile",
             line=dict(color="blue"),
         )
-        trace2 = go.Scatter(
-            x=years,
-            y=percentiles_gender_values,
+        trace2 = dict(
+            type="scatter",
+            x=column(table["Year"]),
+            y=column(table[f"{person_gender} Percentile"]),
             mode="lines+markers",
             name=f"{person_gender} Percentile",
             line=dict(color="purple", dash="dash"),
         )
-        layout = Layout.customize_layout(f"{name}'s Percentile Over the Years", "Year", "Percentile")
-        fig = go.Figure(data=[trace1, trace2], layout=layout)
-        tabular_data = {
-            "Year": [int(y) for y in years],
-            "Overall Percentile": [float(p) for p in percentiles_all_values],
-            f"{person_gender} Percentile": [float(p) for p in percentiles_gender_values],
-        }
-        return jsonify({"graph": fig.to_json(), "table": tabular_data})
+        return render_chart(
+            [trace1, trace2], f"{name}'s Percentile Over the Years", "Year", "Percentile", table=table, table_orient="list"
+        )
 
     @staticmethod
     def plot_average_time_by_gender_age_group_and_year(data, gender, age_group, name=None, show_overall_avg=False, show_user_time=False):
@@ -60,9 +68,10 @@ class UserVisualizer:
         avg_time, overall_avg_time, user_data = data
 
         traces = [
-            go.Scatter(
-                x=avg_time.index.tolist(),
-                y=avg_time.tolist(),
+            dict(
+                type="scatter",
+                x=column(avg_time.index),
+                y=column(avg_time),
                 mode="lines+markers",
                 name=f"Average Time ({gender}, {age_group})",
                 line=dict(color="blue"),
@@ -71,9 +80,10 @@ class UserVisualizer:
 
         if show_overall_avg and overall_avg_time is not None:
             traces.append(
-                go.Scatter(
-                    x=overall_avg_time.index.tolist(),
-                    y=overall_avg_time.tolist(),
+                dict(
+                    type="scatter",
+                    x=column(overall_avg_time.index),
+                    y=column(overall_avg_time),
                     mode="lines",
                     name="Overall Average Time",
                     line=dict(color="red", dash="dash"),
@@ -83,20 +93,77 @@ class UserVisualizer:
         if show_user_time and user_data is not None:
             user_time_by_year = user_data.groupby("Year")["Time (min)"].mean()
             traces.append(
-                go.Scatter(
-                    x=user_time_by_year.index.tolist(),
-                    y=user_time_by_year.tolist(),
+                dict(
+                    type="scatter",
+                    x=column(user_time_by_year.index),
+                    y=column(user_time_by_year),
                     mode="lines+markers",
                     name=f"{name}'s Time",
                     line=dict(color="green"),
                 )
             )
 
-        layout = Layout.customize_layout(
+        return render_chart(
+            traces,
             f"Average Time by Year with Overlays ({gender}, {age_group})",
             "Year",
             "Time (min)",
+            table=avg_time.reset_index(),
+        )
+
+    @staticmethod
+    def plot_batch_summary(data, output_format="graph"):
+        if data is None:
+            return None
+        best, missing = data
+
+        def numbers(series):
+            return [None if math.isnan(value) else value for value in series.to_numpy(dtype="float64", na_value=np.nan).tolist()]
+
+        columns = zip(
+            best["Name"].tolist(),
+            [None if pd.isna(gender) else gender for gender in best["Gender"]],
+            best["Year"].astype("int64").tolist(),
+            numbers(best["time"]),
+            [None if pd.isna(age_group) else str(age_group) for age_group in best["age_group"]],
+            numbers(best["percentile"]),
+            numbers(best["percentile_gender"]),
+            best["position"].tolist(),
+            best["total_participants"].tolist(),
+        )
+        summaries = []
+        # Grouped on the name alone; a missing gender (NaN) would not even compare equal to itself
+        for name, rows in groupby(columns, key=lambda row: row[0]):
+            rows = list(rows)
+            gender = rows[0][1]
+            results = [
+                {
+                    "Year": year,
+                    "Time (min)": time,
+                    "AgeGroup": age_group,
+                    "Overall Percentile": percentile,
+                    "Gender Percentile": percentile_gender,
+                    "Position": position,
+                    "Total Participants": participants,
+                }
+                for _, _, year, time, age_group, percentile, percentile_gender, position, participants in rows
+            ]
+            summaries.append({"name": name, "gender": gender, "results": results})
+
+        if output_format == "data":
+            return json_response({"swimmers": summaries, "missing": missing})
+
+        traces = [
+            dict(
+                type="scatter",
+                x=[result["Year"] for result in summary["results"]],
+                y=[result["Time (min)"] for result in summary["results"]],
+                mode="lines+markers",
+                name=summary["name"],
+            )
+            for summary in summaries
+        ]
+        table = [dict(Name=summary["name"], **result) for summary in summaries for result in summary["results"]]
+        return render_chart(
+            traces, "Swimmer Comparison by Year", "Year", "Time (min)", table=table, output_format="graph", missing=missing
         )
-        fig = go.Figure(data=traces, layout=layout)
-        tabular_data = avg_time.reset_index().to_dict(orient="records")
-        return jsonify({"graph": fig.to_json(), "table": tabular_data})
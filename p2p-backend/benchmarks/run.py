@@ -0,0 +1,270 @@
+"""
+Benchmarks of the data, analysis, visualization and HTTP layers on synthetic datasets.
+
+    python -m benchmarks.run                                   # 10k, 1m and 10m rows
+    python -m benchmarks.run --sizes 10k,1m --output report.json
+    python -m benchmarks.run --compare baseline.json report.json
+
+Each size runs in its own process with DATA_DIR pointing at freshly generated CSVs, so the
+dataset load and memory are measured from a cold start. The report is JSON; --compare exits
+non-zero when a benchmark got slower than the threshold allows.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from .synthetic import generate, parse_size
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SIZES = "10k,1m,10m"
+REPORT_FORMAT = 1
+# Differences below this are noise, whatever the ratio
+NOISE_FLOOR = 0.001
+
+
+def measure(func: Callable, min_time: float, max_repeats: int) -> Dict[str, float]:
+    """Call func until min_time has passed (or max_repeats calls), after one warm-up call that fills caches."""
+    func()
+    samples = []
+    while not samples or (sum(samples) < min_time and len(samples) < max_repeats):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeats": len(samples),
+    }
+
+
+def child_benchmarks(min_time: float, max_repeats: int) -> dict:
+    """Runs inside the per-size process; DATA_DIR is already set."""
+    started = time.perf_counter()
+    from app import create_app
+    from app.routes.api_routes import query_cache, response_cache
+    from app.services.analysis.general_analysis import GeneralAnalysis
+    from app.services.analysis.user_analysis import UserAnalysis
+    from app.services.data.data_loader import SwimDataService, dataset_stats, load_dataset
+    from app.services.visualization.general_visualizer import GeneralVisualizer
+    from app.services.visualization.user_visualizer import UserVisualizer
+
+    result = {"startup_seconds": time.perf_counter() - started, "datasets": dataset_stats(), "benchmarks": {}}
+    app = create_app()
+    dataset = load_dataset()
+    df = dataset.data()
+    name = str(df["Name"].value_counts().index[0])
+    # A year the swimmer raced in, so the user routes time a hit rather than a 404
+    year = int(df.loc[df["Name"] == name, "Year"].mode().iloc[0])
+    gender, age_group = "M", "40-44"
+    index, engine, aggregates = dataset.name_index, dataset.percentile_engine, dataset.aggregates
+
+    def run(group: str, label: str, func: Callable) -> None:
+        try:
+            result["benchmarks"][f"{group}/{label}"] = measure(func, min_time, max_repeats)
+        except Exception as e:  # A broken benchmark should not hide the others
+            result["benchmarks"][f"{group}/{label}"] = {"error": f"{type(e).__name__}: {e}"}
+
+    data_dir = os.environ["DATA_DIR"]
+    run("load", "snapshot", lambda: SwimDataService(data_dir))
+    run("load", "csv", lambda: SwimDataService(data_dir, use_snapshots=False))
+
+    analysis: List[Tuple[str, Callable]] = [
+        ("participation_by_year", lambda: GeneralAnalysis.get_participation_by_year(df)),
+        ("participation_by_year[aggregates]", lambda: GeneralAnalysis.get_participation_by_year(df, aggregates)),
+        ("average_time_by_year", lambda: GeneralAnalysis.get_average_time_by_year(df)),
+        ("average_time_by_year[aggregates]", lambda: GeneralAnalysis.get_average_time_by_year(df, aggregates)),
+        ("participation_by_age_group", lambda: GeneralAnalysis.get_participation_by_age_group(df)),
+        ("participation_by_region", lambda: GeneralAnalysis.get_participation_by_region(df)),
+        ("time_percentiles", lambda: GeneralAnalysis.get_time_percentiles(df)),
+        ("time_percentiles[aggregates]", lambda: GeneralAnalysis.get_time_percentiles(df, aggregates)),
+        ("gender_distribution_by_year", lambda: GeneralAnalysis.get_gender_distribution_by_year(df)),
+        ("top_10_fastest_swimmers", lambda: GeneralAnalysis.get_top_10_fastest_swimmers(df)),
+        ("average_time_by_age_group_and_year", lambda: GeneralAnalysis.get_average_time_by_age_group_and_year(df)),
+        (
+            "average_time_by_age_group_and_year[aggregates]",
+            lambda: GeneralAnalysis.get_average_time_by_age_group_and_year(df, aggregates),
+        ),
+        ("age_vs_time_bins", lambda: GeneralAnalysis.get_age_vs_time_bins(df)),
+        ("age_vs_time_sample", lambda: GeneralAnalysis.get_age_vs_time_sample(df)),
+        ("median_time_by_year", lambda: GeneralAnalysis.get_median_time_by_year(df)),
+        ("median_time_by_year[aggregates]", lambda: GeneralAnalysis.get_median_time_by_year(df, aggregates)),
+        ("user_time_by_year[scan]", lambda: UserAnalysis.get_user_time_by_year(df, name)),
+        ("user_time_by_year", lambda: UserAnalysis.get_user_time_by_year(df, name, index)),
+        ("user_time_percentile_by_year", lambda: UserAnalysis.get_user_time_percentile_by_year(df, name, index, engine)),
+        (
+            "average_time_by_gender_age_group_and_year",
+            lambda: UserAnalysis.get_average_time_by_gender_age_group_and_year(df, gender, age_group, name, index),
+        ),
+        ("user_position_in_year", lambda: UserAnalysis.find_user_position_in_year(df, name, year, index, engine)),
+        ("search_swimmers", lambda: UserAnalysis.search_swimmers(df, name[:4], dataset.search_index, index)),
+    ]
+    for label, func in analysis:
+        run("analysis", label, func)
+
+    visualizers: List[Tuple[str, Callable]] = [
+        ("participation_by_year", lambda d: GeneralVisualizer.plot_participation_by_year(d), GeneralAnalysis.get_participation_by_year(df, aggregates)),
+        ("average_time_by_year", lambda d: GeneralVisualizer.plot_average_time_by_year(*d), GeneralAnalysis.get_average_time_by_year(df, aggregates)),
+        ("participation_by_age_group", lambda d: GeneralVisualizer.plot_participation_by_age_group(d), GeneralAnalysis.get_participation_by_age_group(df)),
+        ("participation_by_region", lambda d: GeneralVisualizer.plot_participation_by_region(d), GeneralAnalysis.get_participation_by_region(df)),
+        ("time_percentiles", lambda d: GeneralVisualizer.plot_time_percentiles(d), GeneralAnalysis.get_time_percentiles(df, aggregates)),
+        ("gender_distribution_by_year", lambda d: GeneralVisualizer.plot_gender_distribution_by_year(d), GeneralAnalysis.get_gender_distribution_by_year(df)),
+        ("top_10_fastest_swimmers", lambda d: GeneralVisualizer.plot_top_10_fastest_swimmers(d), GeneralAnalysis.get_top_10_fastest_swimmers(df)),
+        (
+            "average_time_by_age_group_and_year",
+            lambda d: GeneralVisualizer.plot_average_time_by_age_group_and_year(d),
+            GeneralAnalysis.get_average_time_by_age_group_and_year(df, aggregates),
+        ),
+        ("age_vs_time_bins", lambda d: GeneralVisualizer.plot_age_vs_time_bins(*d), GeneralAnalysis.get_age_vs_time_bins(df)),
+        ("age_vs_time_sample", lambda d: GeneralVisualizer.plot_age_vs_time_distribution(d), GeneralAnalysis.get_age_vs_time_sample(df)),
+        ("median_time_by_year", lambda d: GeneralVisualizer.plot_median_time_by_year(*d), GeneralAnalysis.get_median_time_by_year(df, aggregates)),
+        ("user_time_by_year", lambda d: UserVisualizer.plot_user_time_by_year(d[0]), UserAnalysis.get_user_time_by_year(df, name, index)),
+        (
+            "user_time_percentile_by_year",
+            lambda d: UserVisualizer.plot_user_time_percentile_by_year(d[0]),
+            UserAnalysis.get_user_time_percentile_by_year(df, name, index, engine),
+        ),
+        (
+            "average_time_by_gender_age_group_and_year",
+            lambda d: UserVisualizer.plot_average_time_by_gender_age_group_and_year(d[0], gender, age_group, name, True, True),
+            UserAnalysis.get_average_time_by_gender_age_group_and_year(df, gender, age_group, name, index),
+        ),
+    ]
+    for output_format in ("graph", "data"):
+        with app.test_request_context(f"/?format={output_format}"):
+            for label, plot, data in visualizers:
+                run(f"render[{output_format}]", label, lambda plot=plot, data=data: plot(data))
+
+    routes = [
+        "participation-by-year",
+        "average-time-by-year",
+        "participation-by-age-group",
+        "participation-by-region",
+        "time-percentiles-by-year",
+        "gender-distribution-by-year",
+        "median-time-by-year",
+        "top-10-fastest-swimmers",
+        "average-time-by-age-group-and-year",
+        "average-time-by-age-group-and-year?exact=true",
+        "age-vs-time-distribution",
+        f"user-time-by-year?name={name}",
+        f"user-percentile-by-year?name={name}",
+        f"user-average-time-gender-age-group-and-year?gender={gender}&age_group={age_group}&name={name}&overlay=true&overlay_user_time=true",
+        f"user-position-in-year?name={name}&year={year}",
+        f"swimmers/search?q={name[:4]}",
+    ]
+    client = app.test_client()
+
+    def uncached(url):
+        # Measure the full path: no response or query cache hits, no conditional request
+        response_cache.clear()
+        query_cache.clear()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+
+    for route in routes:
+        run("http", route, lambda url=f"/api/{route}": uncached(url))
+        run("http[cached]", route, lambda url=f"/api/{route}": client.get(url))
+
+    result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result
+
+
+def run_size(size: str, work_dir: Path, min_time: float, max_repeats: int) -> dict:
+    rows = parse_size(size)
+    data_dir = work_dir / size
+    started = time.perf_counter()
+    if not (data_dir / "competitive-swim_results.csv").exists():
+        generate(rows, data_dir)
+    generate_seconds = time.perf_counter() - started
+
+    with tempfile.NamedTemporaryFile(suffix=".json") as out:
+        env = {**os.environ, "DATA_DIR": str(data_dir), "DATA_MMAP": "0"}
+        command = [sys.executable, "-m", "benchmarks.run", "--child", out.name, "--min-time", str(min_time), "--max-repeats", str(max_repeats)]
+        subprocess.run(command, cwd=BACKEND_DIR, env=env, check=True)
+        result = json.loads(Path(out.name).read_text())
+    return {"rows": rows, "generate_seconds": generate_seconds, **result}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline: dict, report: dict, threshold: float) -> List[str]:
+    """Benchmarks whose median got slower than baseline by more than threshold (a fraction)."""
+    regressions = []
+    for size, results in report["sizes"].items():
+        before = baseline.get("sizes", {}).get(size, {}).get("benchmarks", {})
+        for label, timing in results["benchmarks"].items():
+            old = before.get(label)
+            if not old or "median" not in old or "median" not in timing:
+                continue
+            if timing["median"] - old["median"] > NOISE_FLOOR and timing["median"] > old["median"] * (1 + threshold):
+                regressions.append(
+                    f"{size} {label}: {old['median'] * 1000:.2f} ms -> {timing['median'] * 1000:.2f} ms "
+                    f"({timing['median'] / old['median']:.2f}x)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--output", default="benchmark-report.json", help="where to write the JSON report")
+    parser.add_argument("--work-dir", default=None, help="where to keep generated datasets (reused between runs)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend per benchmark")
+    parser.add_argument("--max-repeats", type=int, default=50)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "REPORT"), help="compare two reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        Path(args.child).write_text(json.dumps(child_benchmarks(args.min_time, args.max_repeats)))
+        return 0
+
+    if args.compare:
+        baseline, report = (json.loads(Path(path).read_text()) for path in args.compare)
+        regressions = compare(baseline, report, args.threshold)
+        for line in regressions:
+            print(line)
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1 if regressions else 0
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="p2p-bench-"))
+    report = {
+        "format": REPORT_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: metadata.version(name) for name in ("pandas", "numpy", "plotly", "Flask")},
+        "sizes": {},
+    }
+    for size in args.sizes.split(","):
+        print(f"Benchmarking {size} rows…", file=sys.stderr)
+        report["sizes"][size] = run_size(size, work_dir, args.min_time, args.max_repeats)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
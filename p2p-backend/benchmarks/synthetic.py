@@ -0,0 +1,115 @@
+"""
+Synthetic result CSVs in the schema of the real ones, for benchmarking at scale.
+
+    python -m benchmarks.synthetic 1m ./bench-data
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Same as ingestion.CSV_COLUMNS and data_loader's <id>-swim_results.csv naming. Importing anything from the app
+# package loads the datasets in DATA_DIR, which is what this module is about to write
+CSV_COLUMNS = [
+    "Place", "Name", "Gender", "Pace (min/mi)", "Time (ms)", "Age", "Bib",
+    "Country", "Locality", "Region", "OverallRank", "GenderRank", "RaceDate",
+]
+DATASET_FILES = {True: "competitive-swim_results.csv", False: "non-competitive-swim_results.csv"}
+
+FIRST_NAMES = [
+    "james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "william", "elizabeth",
+    "david", "barbara", "richard", "susan", "joseph", "jessica", "thomas", "sarah", "charles", "karen",
+    "daniel", "nancy", "matthew", "lisa", "anthony", "betty", "mark", "margaret", "steven", "sandra",
+]
+LAST_NAMES = [
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis", "rodriguez", "martinez",
+    "hernandez", "lopez", "gonzalez", "wilson", "anderson", "thomas", "taylor", "moore", "jackson", "martin",
+    "lee", "perez", "thompson", "white", "harris", "sanchez", "clark", "ramirez", "lewis", "robinson",
+]
+REGIONS = ["Wisconsin", "Minnesota", "Illinois", "Michigan", "Iowa", "Ohio", "Indiana", "California", "Texas", "Colorado"]
+YEARS = list(range(2008, 2026))
+CHUNK_ROWS = 1_000_000
+# Swimmers race about three times on average, so the name count scales with the rows
+ROWS_PER_SWIMMER = 3
+
+
+def parse_size(size: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000, plain integers as-is."""
+    size = size.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(size[-1:], 1)
+    return int(float(size.rstrip("km")) * multiplier)
+
+
+def _names(rng: np.random.Generator, count: int) -> np.ndarray:
+    ids = np.arange(count)
+    first = np.array(FIRST_NAMES, dtype=object)[ids % len(FIRST_NAMES)]
+    last = np.array(LAST_NAMES, dtype=object)[(ids // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    suffix = ids // (len(FIRST_NAMES) * len(LAST_NAMES))
+    names = first + " " + last + np.where(suffix > 0, np.char.add(" ", suffix.astype(str)).astype(object), "")
+    rng.shuffle(names)
+    return names
+
+
+def _chunk(rng: np.random.Generator, rows: int, names: np.ndarray, genders: np.ndarray, ages: np.ndarray) -> pd.DataFrame:
+    swimmers = rng.integers(0, len(names), rows)
+    years = rng.choice(YEARS, rows)
+    age = ages[swimmers] + (years - YEARS[0])
+    time_ms = np.clip(rng.lognormal(np.log(80 * 60000), 0.25, rows), 35 * 60000, 300 * 60000).astype(np.int64)
+    missing_time = rng.random(rows) < 0.01
+    return pd.DataFrame(
+        {
+            "Place": pd.array(rng.integers(1, 500, rows), dtype="Int64"),
+            "Name": names[swimmers],
+            "Gender": genders[swimmers],
+            "Pace (min/mi)": time_ms / 60000 / 2,
+            "Time (ms)": pd.arrays.IntegerArray(time_ms, missing_time),
+            "Age": pd.array(age, dtype="Int64"),
+            "Bib": pd.NA,
+            "Country": "US",
+            "Locality": pd.NA,
+            "Region": np.array(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), rows)],
+            "OverallRank": pd.array(rng.integers(1, 500, rows), dtype="Int64"),
+            "GenderRank": pd.array(rng.integers(1, 300, rows), dtype="Int64"),
+            # One race a year, on the second Saturday of August like the real event
+            "RaceDate": pd.to_datetime({"year": years, "month": 8, "day": 10}).dt.strftime("%Y-%m-%d"),
+        },
+        columns=CSV_COLUMNS,
+    )
+
+
+def write_dataset(rows: int, path: Path, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    swimmers = max(rows // ROWS_PER_SWIMMER, 1)
+    names = _names(rng, swimmers)
+    genders = rng.choice(np.array(["M", "F"], dtype=object), swimmers)
+    ages = rng.integers(13, 70, swimmers)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as fh:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = _chunk(rng, min(CHUNK_ROWS, rows - start), names, genders, ages)
+            chunk.to_csv(fh, index=False, header=start == 0)
+
+
+def generate(rows: int, data_dir: Path, seed: int = 0) -> Path:
+    """
+    Write both dataset CSVs into data_dir: the competitive one with rows rows,
+    the non-competitive one a tenth of that, like the real data.
+
+    Args:
+        rows: Rows of the competitive dataset
+        data_dir: Directory to write to; usable as DATA_DIR
+        seed: Seed of the generator, so runs are comparable
+
+    Returns:
+        data_dir
+    """
+    data_dir = Path(data_dir)
+    write_dataset(rows, data_dir / DATASET_FILES[True], seed)
+    write_dataset(max(rows // 10, 1), data_dir / DATASET_FILES[False], seed + 1)
+    return data_dir
+
+
+if __name__ == "__main__":
+    generate(parse_size(sys.argv[1] if len(sys.argv) > 1 else "10k"), Path(sys.argv[2] if len(sys.argv) > 2 else "./bench-data"))
@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+bind = f":{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
+timeout = 0
+
+# Load the datasets once in the master and fork the workers afterwards. The columns are
+# memory-mapped from the read-only snapshot, so every worker shares the same physical pages.
+preload_app = True
+os.environ.setdefault("DATA_MMAP", "1")
+
+# An ingest (enabled by ADMIN_TOKEN) swaps the new rows into the worker that handled it only;
+# the other workers pick the appended CSV up through their data directory watcher
+if os.environ.get("ADMIN_TOKEN"):
+    os.environ.setdefault("DATA_WATCH_INTERVAL", "2")
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork, so every worker starts its own data directory watcher.
+    # Its analysis pool (ANALYSIS_POOL_WORKERS) is forked here too, before any request thread runs.
+    from app.routes.offload import start_pool
+    from app.services.data.data_loader import start_watching
+
+    start_watching()
+    start_pool(worker.app.wsgi())
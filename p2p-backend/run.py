@@ -1,6 +1,9 @@
 from app import create_app
+from app.services.data.data_loader import start_watching
 
 app = create_app()
 
 if __name__ == "__main__":
+    # Under gunicorn each worker starts its watcher from post_fork (gunicorn.conf.py) instead
+    start_watching()
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,24 @@
+import os
+import shutil
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SMALL_DATASET = "non-competitive-swim_results.csv"
+
+# The app loads its datasets from DATA_DIR on import; point it at the repository's data
+# wherever pytest is started from
+os.environ.setdefault("DATA_DIR", DATA_DIR)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A writable data directory holding a copy of the small dataset as "small"."""
+    shutil.copy(os.path.join(DATA_DIR, SMALL_DATASET), tmp_path / "small-swim_results.csv")
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app import create_app
+
+    return create_app().test_client()
@@ -0,0 +1,24 @@
+import pytest
+from app.routes.api_routes import response_cache
+
+
+@pytest.mark.parametrize("output_format", ["graph", "data"])
+def test_supported_formats(client, output_format):
+    response = client.get("/api/participation-by-year", query_string={"dataset": "non-competitive", "format": output_format})
+    assert response.status_code == 200
+    assert ("graph" in response.get_json()) == (output_format == "graph")
+
+
+@pytest.mark.parametrize("route", ["/api/participation-by-year", "/api/user-rivals", "/api/age-vs-time-distribution"])
+def test_unsupported_format_is_a_bad_request(client, route):
+    query = {"dataset": "non-competitive", "name": "megan clark", "year": 2010, "format": "svg"}
+    response = client.get(route, query_string=query)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "format must be one of graph, data"}
+
+
+def test_unsupported_formats_are_not_cached(client):
+    before = len(response_cache._entries)
+    for i in range(20):
+        client.get("/api/participation-by-year", query_string={"dataset": "non-competitive", "format": f"junk{i}"})
+    assert len(response_cache._entries) == before
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+from app.services.data.data_loader import SwimDataService
+
+ROUTE = "/api/average-time-by-year"
+
+
+def test_etag_and_last_modified_are_set(client):
+    response = client.get(ROUTE)
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert "no-cache" in response.headers["Cache-Control"]
+
+
+def test_matching_etag_answers_304(client):
+    etag = client.get(ROUTE).headers["ETag"].strip('"')
+    assert client.get(ROUTE, headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+
+
+def test_compressed_variant_etag_answers_304(client):
+    response = client.get(ROUTE, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert client.get(ROUTE, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_etag_depends_on_parameters(client):
+    assert client.get(ROUTE).headers["ETag"] != client.get(ROUTE, query_string={"exact": "true"}).headers["ETag"]
+
+
+def test_stale_etag_answers_200(client):
+    assert client.get(ROUTE, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_if_modified_since_answers_304_until_the_data_changes(client):
+    last_modified = client.get(ROUTE).headers["Last-Modified"]
+    assert client.get(ROUTE, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(ROUTE, headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client):
+    last_modified = client.get(ROUTE).headers["Last-Modified"]
+    headers = {"If-None-Match": '"stale"', "If-Modified-Since": last_modified}
+    assert client.get(ROUTE, headers=headers).status_code == 200
+
+
+def test_new_version_in_the_same_second_moves_last_modified(data_dir):
+    service = SwimDataService(str(data_dir), use_snapshots=False, preload=())
+    first = service.get_dataset("small")
+
+    # Rewrite the file but keep its mtime in the same second, as a quick re-ingest would
+    path = data_dir / "small-swim_results.csv"
+    stat = path.stat()
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    service.reload()
+
+    second = service.get_dataset("small")
+    assert second.version == first.version + 1
+    assert second.last_modified > first.last_modified
+
+
+def test_forced_reload_of_an_unchanged_file_moves_last_modified(data_dir):
+    # reload() always bumps the version; Last-Modified has to follow it even with no new mtime
+    service = SwimDataService(str(data_dir), use_snapshots=False, preload=())
+    first = service.get_dataset("small")
+    service.reload()
+    second = service.get_dataset("small")
+    assert second.version == first.version + 1
+    assert second.last_modified > first.last_modified
+
+
+def test_app_revision_is_the_same_in_every_process():
+    env = {key: value for key, value in os.environ.items() if key != "K_REVISION"}
+    env["DATA_PRELOAD"] = ""
+    script = "from app.routes.http_caching import APP_REVISION; print(APP_REVISION)"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    revisions = {
+        subprocess.run([sys.executable, "-c", script], cwd=backend, env=env, capture_output=True, text=True, check=True).stdout
+        for _ in range(2)
+    }
+    assert len(revisions) == 1
+
+
+def test_etag_follows_the_data_not_the_worker_local_version(client):
+    # Workers count versions on their own; a reload of the same file must not change the ETag
+    from app.services.data.data_loader import load_dataset, reload_data
+
+    etag = client.get(ROUTE).headers["ETag"]
+    version = load_dataset().version
+    reload_data()
+    assert load_dataset().version == version + 1
+    assert client.get(ROUTE).headers["ETag"] == etag
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from app.services.data.data_gatherer import FetchError, ResultsFetcher
+
+LIMIT = 10
+
+
+def fake_pages(total, failing=()):
+    # Serves `total` results per course in pages of LIMIT; (course id, offset) pairs in
+    # `failing` fail as if their retries ran out
+    def fetch_page(event_id, event_course_id, offset, limit, fetch_stats=None):
+        if (event_course_id, offset) in failing:
+            raise FetchError(f"Page from={offset} failed")
+        return [{"offset": offset + i} for i in range(max(0, min(limit, total - offset)))]
+
+    return fetch_page
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 8])
+def test_fetch_many_returns_every_page_in_order(concurrency):
+    fetcher = ResultsFetcher(concurrency=concurrency)
+    fetcher._fetch_page = fake_pages(35)
+    results, stats = fetcher.fetch_many([("1", "a")], LIMIT)
+    assert [r["offset"] for r in results[("1", "a")]] == list(range(35))
+    assert stats.failed_courses == []
+
+
+def test_failure_past_the_end_keeps_the_course():
+    # With 8 pages in flight the fetcher asks for offsets up to 70; 30 is empty, 50 fails
+    fetcher = ResultsFetcher(concurrency=8)
+    fetcher._fetch_page = fake_pages(25, failing={("a", 50)})
+    results, stats = fetcher.fetch_many([("1", "a")], LIMIT)
+    assert [r["offset"] for r in results[("1", "a")]] == list(range(25))
+    assert stats.failed_courses == []
+
+
+def test_failure_before_the_end_drops_the_course():
+    fetcher = ResultsFetcher(concurrency=8)
+    fetcher._fetch_page = fake_pages(25, failing={("a", 10)})
+    results, stats = fetcher.fetch_many([("1", "a"), ("2", "b")], LIMIT)
+    assert ("1", "a") not in results
+    assert len(results[("2", "b")]) == 25
+    assert stats.failed_courses == [("1", "a")]
+
+
+class StubResults(ThreadingHTTPServer):
+    """
+    Local stand-in for the results API: `totals` results per course id, served in pages.
+    `script` lists the responses of a (course id, offset) before it succeeds: an HTTP status,
+    or a number of seconds to stall. Every request is kept in `requests` with its arrival time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, totals, script=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.totals = totals
+        self.script = defaultdict(list, {key: list(steps) for key, steps in (script or {}).items()})
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def times(self, course, offset):
+        return [at for key, at in self.requests if key == (course, offset)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        course, offset, limit = query["eventCourseId"][0], int(query["from"][0]), int(query["limit"][0])
+        with self.server.lock:
+            self.server.requests.append(((course, offset), time.monotonic()))
+            steps = self.server.script[(course, offset)]
+            step = steps.pop(0) if steps else None
+        if isinstance(step, float):
+            time.sleep(step)
+        elif step is not None:
+            self.send_response(step)
+            self.end_headers()
+            return
+        end = min(offset + limit, self.server.totals[course])
+        results = [{"displayName": f"Swimmer {i}", "time": {"timeInMillis": 3_000_000 + i}} for i in range(offset, end)]
+        body = json.dumps([{"interval": {"intervalResults": results}}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(totals, script=None):
+        server = StubResults(totals, script)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_retries_server_errors_with_backoff(stub):
+    server = stub({"a": 15}, {("a", 0): [500, 429]})
+    fetcher = ResultsFetcher(base_url=server.url, backoff=0.05, max_retries=3)
+    results = list(fetcher.iter_pages("1", "a", LIMIT))
+    assert sum(len(page) for page in results) == 15
+
+    first, second, third = server.times("a", 0)
+    # The delay doubles after every failed attempt
+    assert second - first >= 0.05
+    assert third - second >= 0.1
+
+
+def test_gives_up_after_the_last_retry(stub):
+    server = stub({"a": 15}, {("a", 0): [503] * 10})
+    fetcher = ResultsFetcher(base_url=server.url, backoff=0.01, max_retries=2)
+    with pytest.raises(FetchError, match="after 3 attempts"):
+        fetcher._fetch_page("1", "a", 0, LIMIT)
+    assert len(server.times("a", 0)) == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    server = stub({"a": 15}, {("a", 0): [404]})
+    fetcher = ResultsFetcher(base_url=server.url, backoff=0.01)
+    with pytest.raises(FetchError, match="after 1 attempts"):
+        fetcher._fetch_page("1", "a", 0, LIMIT)
+    assert len(server.times("a", 0)) == 1
+
+
+def test_slow_responses_time_out_and_are_retried(stub):
+    server = stub({"a": 15}, {("a", 10): [1.0]})
+    fetcher = ResultsFetcher(base_url=server.url, timeout=0.2, backoff=0.01, concurrency=2)
+    results, stats = fetcher.fetch_many([("1", "a")], LIMIT)
+    assert len(results[("1", "a")]) == 15
+    assert len(server.times("a", 10)) == 2
+    page = next(page for page in stats.pages if page.offset == 10)
+    assert page.attempts == 2 and page.error is None
+    assert stats.summary()["retries"] == 1
+
+
+def test_requests_stay_within_the_rate_limit(stub):
+    rate = 20
+    server = stub({"a": 40})
+    fetcher = ResultsFetcher(base_url=server.url, rate=rate, concurrency=4)
+    results, _ = fetcher.fetch_many([("1", "a")], 1)
+    assert len(results[("1", "a")]) == 40
+
+    times = sorted(at for _, at in server.requests)
+    # A full bucket of `rate` requests may go at once; after that they are spaced 1/rate apart
+    assert times[-1] - times[0] >= (len(times) - rate) / rate * 0.9
+    for i, at in enumerate(times):
+        assert i + 1 <= rate + (at - times[0]) * rate + 1
+
+
+def test_overlapping_calls_keep_their_own_stats(stub):
+    server = stub({"a": 30, "b": 50}, {("a", 0): [0.2]})
+    fetcher = ResultsFetcher(base_url=server.url, concurrency=2)
+    outcomes = {}
+
+    def fetch(course):
+        outcomes[course] = fetcher.fetch_many([("1", course)], LIMIT)
+
+    threads = [threading.Thread(target=fetch, args=(course,)) for course in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for course, total in (("a", 30), ("b", 50)):
+        results, stats = outcomes[course]
+        assert len(results[("1", course)]) == total
+        assert {page.event_course_id for page in stats.pages} == {course}
+        assert stats.summary()["results"] == total
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.data.columns import minutes
+from app.services.data.data_loader import derive_columns
+from app.services.data.indexes import NameIndex, PercentileEngine
+
+
+def results(rows=400, seed=0, compact=False):
+    # Few distinct times so ties are common, a few missing times and ages
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Name": [f"swimmer {i}" for i in rng.integers(0, rows // 3, rows)],
+            "RaceDate": pd.to_datetime(rng.choice(["2019-08-03", "2019-08-10", "2020-08-01", "2021-08-07"], rows)),
+            "Age": pd.array(rng.integers(13, 80, rows), dtype="Int64"),
+            "Gender": rng.choice(["M", "F", "U"], rows),
+            "Region": "Wisconsin",
+            "Time (ms)": pd.array(rng.integers(40, 70, rows) * 60_000, dtype="Int64"),
+        }
+    )
+    df.loc[rng.choice(rows, 10, replace=False), "Time (ms)"] = pd.NA
+    df.loc[rng.choice(rows, 5, replace=False), "Age"] = pd.NA
+    return derive_columns(df, compact)
+
+
+@pytest.fixture(params=[False, True], ids=["default", "compact"])
+def compact(request):
+    return request.param
+
+
+@pytest.fixture
+def frame(compact):
+    return results(compact=compact)
+
+
+def field(df, year, gender=None, age_group=None):
+    mask = (df["Year"] == year).to_numpy()
+    if gender is not None:
+        mask &= (df["Gender"] == gender).to_numpy() & (df["AgeGroup"].astype(str) == str(age_group)).to_numpy()
+    return mask
+
+
+def test_percentiles_ranks_and_counts_match_a_scan(frame):
+    engine = PercentileEngine(frame)
+    times = minutes(frame).to_numpy(dtype="float64", na_value=np.nan)
+    for year in frame["Year"].unique():
+        in_year = field(frame, year)
+        finished = times[in_year & ~np.isnan(times)]
+        assert engine.participants(year) == in_year.sum()
+        for time in [35.0, 41.0, 55.0, 69.0, 80.0]:
+            assert engine.rank(year, time) == (finished < time).sum() + 1
+            assert engine.percentile(year, time) == pytest.approx((finished >= time).sum() / len(finished) * 100)
+            for gender in ["M", "F"]:
+                by_gender = times[in_year & (frame["Gender"] == gender).to_numpy() & ~np.isnan(times)]
+                expected = (by_gender >= time).sum() / len(by_gender) * 100
+                assert engine.percentile(year, time, gender) == pytest.approx(expected)
+
+
+def test_batch_lookups_match_single_lookups(frame):
+    engine = PercentileEngine(frame)
+    years = np.array([2019, 2020, 2021, 2019, 1999])
+    times = np.array([45.0, 50.0, np.nan, 60.0, 50.0])
+    ranks = engine.ranks(years, times)
+    percentiles = engine.percentiles(years, times)
+    for i, (year, time) in enumerate(zip(years, times)):
+        if not np.isnan(time):
+            assert ranks[i] == engine.rank(year, time)
+    assert np.isnan(percentiles[2]) and np.isnan(percentiles[4])
+    assert percentiles[0] == pytest.approx(engine.percentile(2019, 45.0))
+
+
+def test_group_participants_include_missing_times(frame):
+    engine = PercentileEngine(frame)
+    counts = frame.groupby(["Year", "Gender", "AgeGroup"], observed=True).size()
+    for (year, gender, age_group), count in counts.items():
+        assert engine.participants(year, gender, age_group) == count
+
+
+def test_updated_matches_a_rebuild(frame, compact):
+    extra = results(rows=60, seed=1, compact=compact)
+    combined = pd.concat([frame, extra], ignore_index=True)
+    updated = PercentileEngine(frame).updated(combined, extra["Year"].unique())
+    rebuilt = PercentileEngine(combined)
+    for table in PercentileEngine._TABLES:
+        expected, actual = getattr(rebuilt, table), getattr(updated, table)
+        assert actual.keys() == expected.keys(), table
+        for key in expected:
+            assert np.array_equal(np.asarray(actual[key]), np.asarray(expected[key])), (table, key)
+
+
+def test_name_index_positions_and_extension():
+    names = pd.Series(["a", "b", "a", None, "c", "a"])
+    index = NameIndex(names)
+    assert index.positions("a").tolist() == [0, 2, 5]
+    assert index.positions("missing").tolist() == []
+    assert "b" in index and len(index) == 3
+
+    extended = index.extended(pd.Series(["b", "d"]), offset=len(names))
+    assert extended.positions("b").tolist() == [1, 6]
+    assert extended.positions("d").tolist() == [7]
+    assert index.positions("b").tolist() == [1]
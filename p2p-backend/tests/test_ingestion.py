@@ -0,0 +1,115 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from app.routes import admin_routes
+from app.services.data.data_loader import AlreadyIngested, SwimDataService
+
+
+def race(date, rows=6):
+    # A race as ResultsFetcher.parse_results returns it
+    times = np.arange(rows) * 60_000 + 3_000_000
+    return pd.DataFrame(
+        {
+            "place": np.arange(1, rows + 1),
+            "name": [f"ingested swimmer {i}" for i in range(rows - 1)] + ["megan clark"],
+            "gender": ["M", "F"] * (rows // 2),
+            "pace": times / 120_000,
+            "time": times,
+            "age": [25, 31, 47, 52, 19, 70][:rows],
+            "bib": np.arange(rows),
+            "country": "US",
+            "locality": "Madison",
+            "region": "Wisconsin",
+            "overall_rank": np.arange(1, rows + 1),
+            "gender_rank": np.arange(1, rows + 1),
+            "race_date": pd.Timestamp(date),
+        }
+    )
+
+
+def assert_same_dataset(ingested, loaded):
+    assert len(ingested.df) == len(loaded.df)
+    for column in loaded.df.columns:
+        left = ingested.df[column].astype(object).where(ingested.df[column].notna(), None)
+        right = loaded.df[column].astype(object).where(loaded.df[column].notna(), None)
+        assert left.tolist() == right.tolist(), column
+
+    for name in ["megan clark", "ingested swimmer 0", "john maguire"]:
+        assert ingested.name_index.positions(name).tolist() == loaded.name_index.positions(name).tolist()
+
+    for table in type(loaded.percentile_engine)._TABLES:
+        expected = getattr(loaded.percentile_engine, table)
+        actual = getattr(ingested.percentile_engine, table)
+        assert actual.keys() == expected.keys(), table
+        for key in expected:
+            assert np.array_equal(np.asarray(actual[key]), np.asarray(expected[key])), (table, key)
+
+    pd.testing.assert_series_equal(ingested.aggregates.participation_by_year(), loaded.aggregates.participation_by_year())
+    expected, expected_overall = loaded.aggregates.average_time_by_year()
+    actual, actual_overall = ingested.aggregates.average_time_by_year()
+    pd.testing.assert_series_equal(actual, expected)
+    assert actual_overall == pytest.approx(expected_overall)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("date", ["2010-09-01", "2031-07-04"], ids=["existing-year", "new-year"])
+def test_ingest_matches_a_fresh_load(data_dir, compact, date):
+    service = SwimDataService(str(data_dir), use_snapshots=False, compact=compact, preload=())
+    before = service.get_dataset("small")
+    ingested = service.ingest(race(date), "small")
+    assert ingested.version == before.version + 1
+    assert len(ingested.df) == len(before.df) + 6
+
+    loaded = SwimDataService(str(data_dir), use_snapshots=False, compact=compact, preload=()).get_dataset("small")
+    assert_same_dataset(ingested, loaded)
+
+
+def test_ingesting_a_race_twice_is_rejected(data_dir):
+    service = SwimDataService(str(data_dir), use_snapshots=False, preload=())
+    service.ingest(race("2031-07-04"), "small")
+    size = (data_dir / "small-swim_results.csv").stat().st_size
+    with pytest.raises(AlreadyIngested, match="already ingested"):
+        service.ingest(race("2031-07-04"), "small")
+    assert (data_dir / "small-swim_results.csv").stat().st_size == size
+    assert service.get_dataset("small").version == 2
+
+
+def test_ingest_into_a_new_dataset_creates_it(data_dir):
+    service = SwimDataService(str(data_dir), use_snapshots=False, preload=())
+    created = service.ingest(race("2031-07-04"), "fresh")
+    assert len(created.df) == 6
+    assert "fresh" in service.dataset_ids()
+
+
+def test_other_workers_pick_up_an_ingest_through_their_watcher(data_dir):
+    ingesting = SwimDataService(str(data_dir), use_snapshots=False, preload=("small",))
+    other = SwimDataService(str(data_dir), use_snapshots=False, preload=("small",))
+    other.watch(0.05)
+
+    updated = ingesting.ingest(race("2031-07-04"), "small")
+    deadline = time.monotonic() + 5
+    while other.get_dataset("small").source != updated.source and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    reloaded = other.get_dataset("small")
+    assert reloaded.source == updated.source
+    assert len(reloaded.df) == len(updated.df)
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [(AlreadyIngested("Results for 2031-07-04 were already ingested"), 409), (ValueError("Parsed results are missing fields: time"), 400)],
+    ids=["duplicate", "malformed"],
+)
+def test_ingest_route_statuses(client, monkeypatch, error, status):
+    def ingest(results, dataset_id):
+        raise error
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(admin_routes.ResultsFetcher, "fetch_and_parse", lambda self, *args: race("2031-07-04"))
+    monkeypatch.setattr(admin_routes, "ingest_results", ingest)
+    body = {"event_id": "1", "event_course_id": "2", "race_date": "2031-07-04"}
+    response = client.post("/api/admin/ingest", json=body, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == status
+    assert str(error) in response.get_json()["error"]
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.services.execution.pool import PoolSaturated, ProcessPool, TaskTimeout
+
+
+def square(value):
+    return value * value
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def die():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessPool(workers=1, queue_size=0, timeout=1.0)
+    pool.start()
+    yield pool
+    pool._discard(pool._executor)
+
+
+def run_in_background(pool, func, *args):
+    thread = threading.Thread(target=lambda: pool.run(func, *args), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_runs_tasks_in_another_process(pool):
+    assert pool.run(square, 7) == 49
+    assert pool.run(os.getpid) != os.getpid()
+
+
+def test_rejects_tasks_beyond_workers_and_queue(pool):
+    busy = run_in_background(pool, sleep, 0.5)
+    time.sleep(0.1)
+    with pytest.raises(PoolSaturated):
+        pool.run(square, 2)
+    busy.join()
+    assert pool.run(square, 2) == 4
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_queue_size_admits_waiting_tasks():
+    pool = ProcessPool(workers=1, queue_size=1, timeout=1.0)
+    busy = run_in_background(pool, sleep, 0.3)
+    time.sleep(0.1)
+    assert pool.run(square, 3) == 9
+    busy.join()
+    pool._discard(pool._executor)
+
+
+def test_times_out_and_frees_the_worker(pool):
+    started = time.monotonic()
+    with pytest.raises(TaskTimeout):
+        pool.run(sleep, 10)
+    assert time.monotonic() - started < 3
+    assert pool.run(square, 5) == 25
+
+
+def test_recovers_after_a_worker_dies(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.run(die)
+    assert pool.run(square, 6) == 36
@@ -0,0 +1,54 @@
+import pickle
+from app.routes.api_routes import query_cache
+from app.services.cache.query_cache import LRUBackend, QueryCache
+
+
+class Exploit:
+    unpickled = False
+
+    def __reduce__(self):
+        return setattr, (Exploit, "unpickled", True)
+
+
+def test_memoize_computes_once():
+    cache = QueryCache(LRUBackend())
+    calls = []
+    for _ in range(3):
+        assert cache.memoize("route", ("small", (10, 1)), lambda: calls.append(1) or {"position": 1}) == {"position": 1}
+    assert len(calls) == 1
+
+
+def test_unsigned_results_are_never_unpickled():
+    backend = LRUBackend()
+    cache = QueryCache(backend)
+    key = ("small", (10, 1))
+    cache.memoize("route", key, lambda: "real")
+    # Something else with access to the backend replaces the entry
+    backend.set(("result", "route", key), b"\0" * 32 + pickle.dumps(Exploit()))
+    assert cache.memoize("route", key, lambda: "recomputed") == "recomputed"
+    assert not Exploit.unpickled
+
+
+def test_results_are_bound_to_their_key():
+    backend = LRUBackend()
+    cache = QueryCache(backend)
+    cache.memoize("route", "a", lambda: "for a")
+    backend.set(("result", "route", "b"), backend.get(("result", "route", "a")))
+    assert cache.memoize("route", "b", lambda: "for b") == "for b"
+
+
+def test_processes_share_results_only_with_the_same_secret():
+    backend = LRUBackend()
+    QueryCache(backend, b"shared").memoize("route", "key", lambda: "cached")
+    assert QueryCache(backend, b"shared").memoize("route", "key", lambda: "recomputed") == "cached"
+    assert QueryCache(backend, b"other").memoize("route", "key", lambda: "recomputed") == "recomputed"
+
+
+def test_keys_follow_the_csv_not_the_version(client):
+    from app.services.data.data_loader import load_dataset
+
+    query = {"name": "john maguire", "year": 2010, "dataset": "non-competitive"}
+    assert client.get("/api/user-position-in-year", query_string=query).status_code == 200
+    dataset = load_dataset("non-competitive")
+    keys = [key for key in query_cache.backend._entries if key[1] == "api.get_user_position"]
+    assert keys and all(key[2][:2] == ("non-competitive", dataset.source) for key in keys)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from app.services.analysis.user_analysis import UserAnalysis
+from app.services.data.columns import minutes
+from app.services.data.indexes import NameIndex, PercentileEngine
+from test_indexes import field, results
+
+
+@pytest.fixture(params=[False, True], ids=["default", "compact"])
+def frame(request):
+    return results(compact=request.param)
+
+
+def expected_rivals(df, times, position, k, gender=None, age_group=None):
+    # Field sorted by time, ties by row; the swimmer's own results left out
+    year = df["Year"].iloc[position]
+    rows = np.flatnonzero(field(df, year, gender, age_group) & ~np.isnan(times))
+    rows = rows[np.lexsort((rows, times[rows]))]
+    rows = rows[df["Name"].iloc[rows].to_numpy() != df["Name"].iloc[position]]
+    time = times[position]
+    return rows[times[rows] < time][-k:], rows[times[rows] >= time][:k]
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_rivals_match_a_sorted_scan(frame, k):
+    engine = PercentileEngine(frame)
+    index = NameIndex(frame["Name"])
+    times = minutes(frame).to_numpy(dtype="float64", na_value=np.nan)
+    for position in np.random.default_rng(2).choice(len(frame), 50, replace=False):
+        if np.isnan(times[position]):
+            continue
+        year = frame["Year"].iloc[position]
+        own = index.positions(frame["Name"].iloc[position])
+        gender, age_group = frame["Gender"].iloc[position], str(frame["AgeGroup"].iloc[position])
+        for scope in [(None, None), (gender, age_group)]:
+            ahead, behind = engine.rivals(year, times[position], k, *scope, exclude=own)
+            expected_ahead, expected_behind = expected_rivals(frame, times, position, k, *scope)
+            assert ahead.tolist() == expected_ahead.tolist()
+            assert behind.tolist() == expected_behind.tolist()
+
+
+def test_places_count_like_rank(frame):
+    engine = PercentileEngine(frame)
+    for time in [40.0, 52.0, 75.0]:
+        assert engine.places(2019, [time])[0] == engine.rank(2019, time)
+
+
+def test_rivals_of_an_empty_field_are_empty(frame):
+    ahead, behind = PercentileEngine(frame).rivals(1999, 50.0, 5)
+    assert len(ahead) == 0 and len(behind) == 0
+
+
+def test_find_user_rivals(frame):
+    engine = PercentileEngine(frame)
+    index = NameIndex(frame["Name"])
+    times = minutes(frame).to_numpy(dtype="float64", na_value=np.nan)
+    position = int(np.flatnonzero(~np.isnan(times))[0])
+    name, year = frame["Name"].iloc[position], int(frame["Year"].iloc[position])
+
+    data, error = UserAnalysis.find_user_rivals(frame, name, year, 2, index, engine)
+    assert error is None
+    assert data["overall"]["total_participants"] == engine.participants(year)
+    for scope in ("overall", "gender_age_group"):
+        listed = data[scope]["ahead"] + data[scope]["behind"]
+        assert all(rival["name"] != name for rival in listed)
+        assert [rival["time"] for rival in listed] == sorted(rival["time"] for rival in listed)
+        assert all(rival["time"] < data["time"] for rival in data[scope]["ahead"])
+
+    _, error = UserAnalysis.find_user_rivals(frame, name, 1999, 2, index, engine)
+    assert error
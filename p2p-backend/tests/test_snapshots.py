@@ -0,0 +1,38 @@
+import json
+import threading
+import pandas as pd
+from app.services.data.data_loader import SwimDataService
+from app.services.data.snapshot import SNAPSHOT_DIRNAME, write_snapshot
+from test_ingestion import race
+
+
+def wait_for_refreshes():
+    for thread in threading.enumerate():
+        if thread.name == "snapshot-refresh":
+            thread.join()
+
+
+def test_snapshot_of_a_changed_csv_is_not_written(data_dir):
+    source = data_dir / "small-swim_results.csv"
+    stat = source.stat()
+    snapshot_dir = data_dir / SNAPSHOT_DIRNAME
+    df = pd.DataFrame({"Year": [2010]})
+    assert write_snapshot(df, source, snapshot_dir, source_state=(stat.st_size - 1, stat.st_mtime_ns)) is None
+    assert not (snapshot_dir / "small-swim_results.json").exists()
+    assert write_snapshot(df, source, snapshot_dir, source_state=(stat.st_size, stat.st_mtime_ns)) is not None
+
+
+def test_superseded_refresh_keeps_the_latest_snapshot(data_dir):
+    service = SwimDataService(str(data_dir), preload=())
+    service.get_dataset("small")
+    first = service.ingest(race("2031-07-04"), "small")
+    second = service.ingest(race("2031-08-01"), "small")
+    wait_for_refreshes()
+    # The first ingest's refresh arriving last must not save its rows under the newer CSV
+    service._refresh_snapshot(first)
+
+    snapshot_dir = data_dir / SNAPSHOT_DIRNAME
+    manifest = json.loads((snapshot_dir / "small-swim_results.json").read_text())
+    assert manifest["rows"] == len(second.df)
+    assert not [path for path in snapshot_dir.iterdir() if ".tmp-" in path.name]
+    assert len(SwimDataService(str(data_dir), preload=()).get_dataset("small").df) == len(second.df)
@@ -0,0 +1,71 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.visualization.user_visualizer import UserVisualizer
+
+
+@pytest.mark.parametrize("route", ["/api/user-position-in-year", "/api/user-rivals"])
+def test_non_integer_year_is_a_bad_request(client, route):
+    response = client.get(route, query_string={"name": "john maguire", "year": "abc", "dataset": "non-competitive"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "year must be an integer"}
+
+
+@pytest.mark.parametrize("route", ["/api/user-position-in-year", "/api/user-rivals"])
+def test_missing_parameters_are_a_bad_request(client, route):
+    assert client.get(route, query_string={"name": "john maguire"}).status_code == 400
+
+
+def test_position_in_year(client):
+    response = client.get("/api/user-position-in-year", query_string={"name": "john maguire", "year": 2010, "dataset": "non-competitive"})
+    assert response.status_code == 200
+    assert response.get_json()["position"] == 1
+
+
+def test_unknown_swimmer_is_not_found(client):
+    response = client.get("/api/user-position-in-year", query_string={"name": "nobody at all", "year": 2010})
+    assert response.status_code == 404
+
+
+def test_rivals(client):
+    query = {"name": "megan clark", "year": 2010, "k": 2, "dataset": "non-competitive"}
+    response = client.get("/api/user-rivals", query_string=query)
+    assert response.status_code == 200
+    body = response.get_json()
+    # Second overall in 2010: one finisher ahead, k behind
+    assert body["overall"]["position"] == 2
+    assert [rival["name"] for rival in body["overall"]["ahead"]] == ["john maguire"]
+    assert len(body["overall"]["behind"]) == 2
+    assert client.get("/api/user-rivals", query_string={**query, "k": 0}).status_code == 400
+
+
+@pytest.mark.parametrize("year", [True, "2010", 2010.5])
+def test_batch_year_must_be_an_integer(client, year):
+    body = {"names": ["john maguire"], "year": year, "dataset": "non-competitive"}
+    response = client.post("/api/users/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "year must be an integer"}
+
+
+def test_batch_summary_keeps_a_swimmer_without_gender_together():
+    best = pd.DataFrame(
+        {
+            "Name": ["ann lee", "ann lee", "bo park"],
+            # Separate NaN objects, as a missing value can come out of pandas
+            "Gender": [float("nan"), float("nan"), "M"],
+            "Year": [2010, 2011, 2010],
+            "time": [50.0, 48.5, 61.0],
+            "age_group": ["30-34", "30-34", "40-44"],
+            "percentile": [80.0, 85.0, 40.0],
+            "percentile_gender": [np.nan, np.nan, 45.0],
+            "position": [3, 2, 9],
+            "total_participants": [20, 22, 20],
+        }
+    )
+    response = UserVisualizer.plot_batch_summary((best, []), "data")
+    swimmers = json.loads(response.get_data())["swimmers"]
+    assert [(swimmer["name"], swimmer["gender"], len(swimmer["results"])) for swimmer in swimmers] == [
+        ("ann lee", None, 2),
+        ("bo park", "M", 1),
+    ]